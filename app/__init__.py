@@ -1,15 +1,52 @@
 from flask import Flask
 from config import Config, Base
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
-app = Flask(__name__)
+db = SQLAlchemy(model_class=Base)
 
-app.config.from_object(Config)
-app.app_context().push()
 
-db = SQLAlchemy(model_class=Base)
-# initialize the app with the extension
-db.init_app(app)
+def _set_sqlite_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return on_connect
+
+
+def create_app(config=Config):
+    """Build the Flask app.
+
+    Only wires config, the db extension, routes and CLI commands; it never
+    touches the schema, so importing the package or starting a worker does
+    no DDL. Create or upgrade the schema with `flask --app app init-db`.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    # initialize the app with the extension
+    db.init_app(app)
+
+    # Per-connection SQLite settings (see config.sqlite_pragmas); runs when
+    # the pool opens a connection, not at startup
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if pragmas:
+        with app.app_context():
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas(pragmas))
+
+    from app import models  # noqa: F401 (registers the mappers)
+    from app.routes import bp as main_bp
+    from app.commands import bp as commands_bp
+    app.register_blueprint(main_bp)
+    app.register_blueprint(commands_bp)
+
+    from app import assets, fragments
+    assets.init_app(app)
+    fragments.init_app(app)
 
+    if app.config.get('PROFILING'):
+        from app import profiling
+        profiling.init_app(app)
 
-from app import routes, models
+    return app
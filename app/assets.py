@@ -0,0 +1,110 @@
+"""Fingerprinted URLs for the files under app/static.
+
+url_for('static', filename='css/style.css') renders as
+/static/css/style.<digest>.css, where <digest> is a hash of the file's
+contents. A request for a file's current fingerprint is served with a
+long-lived, immutable Cache-Control (ASSET_MAX_AGE), so browsers stop
+revalidating assets; editing a file changes its URL, so pages link the new
+version at once. Any other name (the plain path, or an outdated
+fingerprint) is served as before and revalidated.
+
+Digests are cached per process and recomputed when a file's size or mtime
+changes, so the development server picks up edits without a restart.
+"""
+
+import hashlib
+import os
+import re
+
+from flask import current_app, send_from_directory
+from werkzeug.security import safe_join
+
+DIGEST_LENGTH = 12
+
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % DIGEST_LENGTH)
+
+
+class Fingerprints:
+    """Content digests of the files in one folder, keyed by relative path"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._digests = {}  # filename -> ((mtime_ns, size), digest)
+
+    def digest(self, filename):
+        """Hash of a file's contents, or None if there is no such file"""
+        path = safe_join(self.folder, filename)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._digests.get(filename)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:DIGEST_LENGTH]
+        self._digests[filename] = (key, digest)
+        return digest
+
+    def url_name(self, filename):
+        """The fingerprinted name to link a file by"""
+        stem, ext = os.path.splitext(filename)
+        digest = self.digest(filename) if ext else None
+        return filename if digest is None else f'{stem}.{digest}{ext}'
+
+    def resolve(self, requested):
+        """(file to serve, whether `requested` names its current fingerprint)"""
+        match = _FINGERPRINTED.match(requested)
+        if match is None or self.digest(requested) is not None:
+            return requested, False
+        filename = match['stem'] + match['ext']
+        return filename, self.digest(filename) == match['digest']
+
+    def combined(self):
+        """One digest over every file in the folder"""
+        h = hashlib.sha256()
+        for root, _, files in sorted(os.walk(self.folder)):
+            for name in sorted(files):
+                filename = os.path.relpath(os.path.join(root, name), self.folder)
+                h.update(f'{filename}:{self.digest(filename)}\n'.encode())
+        return h.hexdigest()[:DIGEST_LENGTH]
+
+
+def init_app(app):
+    """Fingerprint static URLs and serve them with long-lived caching"""
+    static = Fingerprints(app.static_folder)
+    templates = Fingerprints(os.path.join(app.root_path, app.template_folder))
+    app.extensions['assets'] = {'static': static, 'templates': templates, 'build_id': None}
+
+    @app.url_defaults
+    def fingerprint_static_urls(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = static.url_name(values['filename'])
+
+    def send_static_file(filename):
+        filename, current = static.resolve(filename)
+        if not current:
+            return send_from_directory(app.static_folder, filename)
+        response = send_from_directory(app.static_folder, filename, max_age=app.config['ASSET_MAX_AGE'])
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = send_static_file
+
+
+def build_id():
+    """Digest of the templates and static files pages are rendered from.
+
+    Part of every ETag (see app/etags.py), so a deploy that changes a
+    template or an asset invalidates cached pages. Computed once per
+    process, or on every call in debug mode.
+    """
+    assets = current_app.extensions['assets']
+    if assets['build_id'] is None or current_app.debug:
+        assets['build_id'] = hashlib.sha256(
+            (assets['templates'].combined() + assets['static'].combined()).encode()
+        ).hexdigest()[:DIGEST_LENGTH]
+    return assets['build_id']
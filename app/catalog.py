@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from app.models import TaskTemplate, TEMPLATE_LIST_LOADING
+
+
+@dataclass(frozen=True)
+class SubTaskEntry:
+    """Read-only copy of a SubTask row"""
+    id: int
+    description: str
+    level: int
+    order: int
+
+
+@dataclass(frozen=True)
+class TemplateEntry:
+    """Read-only copy of an active TaskTemplate and its ordered subtasks.
+
+    Exposes the same attributes the templates read from TaskTemplate, so it
+    can be rendered in place of the ORM object.
+    """
+    id: int
+    title: str
+    category: str
+    task_type: str
+    effort_type: Optional[str]
+    location_type: Optional[str]
+    base_xp_low: int
+    base_xp_medium: int
+    base_xp_high: int
+    subtasks: Tuple[SubTaskEntry, ...]
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    version: int
+    templates: Tuple[TemplateEntry, ...]
+
+
+class TemplateCatalog:
+    """In-memory copies of each user's active template library, by catalog_version.
+
+    Callers pass the user's catalog_version (from current_progress(), so no
+    query is spent on it). Every template change bumps that counter in the
+    database, so a snapshot built for an older version is rebuilt on its
+    next read, in whichever worker process serves it: edits, imports and
+    other processes' writes all show up once the reader's Progress has
+    caught up (at most PROGRESS_CACHE_SECONDS; at once in the process that
+    made the change, which drops its cached Progress). The version is also
+    what keys HTTP caching of the list.
+
+    Snapshots are kept for the `max_users` most recently read users.
+    invalidate() drops snapshots outright, for writes that bypass the
+    counter (tests, bulk loaders).
+    """
+
+    def __init__(self, max_users=1024):
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, user_id=None):
+        """Drop one user's snapshot, or everyone's"""
+        with self._lock:
+            if user_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(user_id, None)
+
+    def _build(self, user_id, version):
+        rows = (
+            TaskTemplate.query.options(*TEMPLATE_LIST_LOADING)
+            .filter_by(user_id=user_id, is_active=True)
+            .order_by(TaskTemplate.id)
+            .all()
+        )
+        templates = tuple(
+            TemplateEntry(
+                id=t.id,
+                title=t.title,
+                category=t.category,
+                task_type=t.task_type,
+                effort_type=t.effort_type,
+                location_type=t.location_type,
+                base_xp_low=t.base_xp_low,
+                base_xp_medium=t.base_xp_medium,
+                base_xp_high=t.base_xp_high,
+                subtasks=tuple(SubTaskEntry(st.id, st.description, st.level, st.order) for st in t.subtasks),
+            )
+            for t in rows
+        )
+        return _Snapshot(version, templates)
+
+    def _current(self, user_id, version):
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            # A snapshot newer than the caller's version is kept: the caller's
+            # Progress is just older than the one that built it
+            if snapshot is not None and snapshot.version >= version:
+                self._snapshots.move_to_end(user_id)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        # Built outside the lock. A template edited meanwhile bumps the
+        # version past this one, so the next read rebuilds again
+        snapshot = self._build(user_id, version)
+        with self._lock:
+            current = self._snapshots.get(user_id)
+            if current is None or current.version <= version:
+                self._snapshots[user_id] = snapshot
+                self._snapshots.move_to_end(user_id)
+            while len(self._snapshots) > self.max_users:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def templates(self, user_id, version, category=None, effort_type=None, location_type=None):
+        """A user's active templates as of catalog_version `version`, in id order, optionally filtered"""
+        result = self._current(user_id, version).templates
+        if category:
+            result = [t for t in result if t.category == category]
+        if effort_type:
+            result = [t for t in result if t.effort_type == effort_type]
+        if location_type:
+            result = [t for t in result if t.location_type == location_type]
+        return list(result)
+
+    def stats(self):
+        total = self.hits + self.misses
+        snapshots = list(self._snapshots.values())
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'users': len(snapshots),
+            'templates': sum(len(s.templates) for s in snapshots),
+        }
+
+
+catalog = TemplateCatalog()
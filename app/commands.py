@@ -0,0 +1,197 @@
+import click
+import time
+from datetime import date, timedelta
+from flask import Blueprint, current_app
+from sqlalchemy import inspect
+
+from app import db
+from app import library
+from app.graph import exporter_from_config
+from app.outbox import OutboxWorker, queue_metrics, sync_user_id
+from app.models import (DEFAULT_USER_ID, TaskInstance, DailyStat, UserProgress, rebuild_completion_counts,
+                        daily_completion_totals)
+
+# Registered on the app by create_app(); cli_group=None puts the commands at
+# the top level (`flask --app app init-db`, not `flask --app app commands init-db`)
+bp = Blueprint('commands', __name__, cli_group=None)
+
+
+def add_missing_columns(model):
+    """ALTER older tables to add columns that create_all() will not add"""
+    table = getattr(model, '__table__', model)
+    existing = {col['name'] for col in inspect(db.engine).get_columns(table.name)}
+    added = []
+    with db.engine.begin() as conn:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            conn.execute(db.text(ddl))
+            added.append(column.name)
+    return added
+
+
+def drop_stale_indexes():
+    """Drop ix_ indexes on our tables that the models no longer declare"""
+    inspector = inspect(db.engine)
+    dropped = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            declared = {index.name for index in table.indexes}
+            for index in inspector.get_indexes(table.name):
+                if index['name'].startswith('ix_') and index['name'] not in declared:
+                    conn.execute(db.text(f'DROP INDEX {index["name"]}'))
+                    dropped.append(index['name'])
+    return dropped
+
+
+def init_db():
+    """Create or upgrade the schema in place and provision the default user.
+
+    Safe to run repeatedly: creates missing tables, adds columns and indexes
+    that create_all() skips on tables that already exist, drops indexes the
+    models replaced, fills a newly created daily rollup and newly added
+    per-instance completion counters from existing history, and inserts
+    the default UserProgress row so no request has to. Rows that predate
+    the user_id columns belong to DEFAULT_USER_ID. Returns
+    {table: [added columns]}.
+    """
+    rollup_existed = inspect(db.engine).has_table(DailyStat.__tablename__)
+    db.create_all()
+
+    added = {}
+    for table in db.metadata.sorted_tables:
+        columns = add_missing_columns(table)
+        if columns:
+            added[table.name] = columns
+
+    drop_stale_indexes()
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+    UserProgress.provision(DEFAULT_USER_ID)
+    if not rollup_existed:
+        DailyStat.rebuild()
+    if {'completed_count', 'available_count'} & set(added.get(TaskInstance.__tablename__, ())):
+        rebuild_completion_counts()
+    db.session.commit()
+    return added
+
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the database schema (run once per deploy)"""
+    added = init_db()
+    for table, columns in added.items():
+        click.echo(f"Added columns to {table}: {', '.join(columns)}")
+    click.echo('Database schema is up to date')
+
+
+@bp.cli.command('create-user')
+@click.argument('user_id', type=int, required=False)
+def create_user(user_id):
+    """Provision a user (the next free id if none is given)"""
+    if user_id is None:
+        user_id = (db.session.scalar(db.select(db.func.max(UserProgress.id))) or 0) + 1
+    created = UserProgress.provision(user_id)
+    db.session.commit()
+    click.echo(f'Created user {user_id}' if created else f'User {user_id} already exists')
+
+
+@bp.cli.command('repair-counters')
+def repair_counters():
+    """Rebuild per-instance completion counters from subtask completions"""
+    added = add_missing_columns(TaskInstance)
+    if added:
+        click.echo(f"Added columns to task_instance: {', '.join(added)}")
+
+    updated = rebuild_completion_counts()
+    db.session.commit()
+    click.echo(f'Rebuilt completion counters for {updated} task instances')
+
+
+@bp.cli.command('backfill-daily-stats')
+def backfill_daily_stats():
+    """Rebuild the per-user daily rollup from completed task instances"""
+    written = DailyStat.rebuild()
+    db.session.commit()
+    click.echo(f'Rebuilt daily stats: {written} day/category rows')
+
+
+@bp.cli.command('sync-graph')
+@click.option('--days', default=7, show_default=True, help='Number of recent days to push.')
+def sync_graph(days):
+    """Push the sync user's recent daily completion totals through the configured exporter"""
+    exporter = exporter_from_config(current_app.config)
+    last_day = date.today()
+    first_day = last_day - timedelta(days=days - 1)
+    totals = daily_completion_totals(sync_user_id(current_app), first_day, last_day)
+    try:
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            exporter.put_day(day, totals.get(day, 0))
+    finally:
+        exporter.close()
+    click.echo(f'Pushed {days} days to the {exporter.name} exporter')
+
+
+@bp.cli.command('outbox-worker')
+@click.option('--once', is_flag=True, help='Drain one batch and exit.')
+def outbox_worker(once):
+    """Deliver queued graph updates (run with OUTBOX_IN_PROCESS=0 on web workers)"""
+    worker = OutboxWorker(current_app._get_current_object())
+    try:
+        if once:
+            processed = worker.drain_once()
+            click.echo(f'Processed {processed} outbox rows: {worker.metrics()}')
+            return
+        click.echo(f'Draining graph outbox through the {worker.exporter.name} exporter (Ctrl+C to stop)')
+        worker.start()
+        while True:
+            time.sleep(30)
+            click.echo(f'queue={queue_metrics(worker.max_attempts)} worker={worker.metrics()}')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+
+
+@bp.cli.command('export-templates')
+@click.option('--format', 'fmt', type=click.Choice(library.FORMATS), default='jsonl', show_default=True)
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+              help='File to write (default: stdout).')
+@click.option('--user', 'user_id', type=int, default=DEFAULT_USER_ID, show_default=True,
+              help='Whose library to export.')
+def export_templates(fmt, output, user_id):
+    """Stream a user's template library out as JSONL or CSV"""
+    for chunk in library.export_templates(fmt, user_id):
+        output.write(chunk)
+
+
+@bp.cli.command('import-templates')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(library.FORMATS),
+              help='Input format (default: from the file extension, else jsonl).')
+@click.option('--chunk-size', default=library.CHUNK_SIZE, show_default=True)
+@click.option('--user', 'user_id', type=int, default=DEFAULT_USER_ID, show_default=True,
+              help='Whose library to import into (must exist, see create-user).')
+def import_templates(source, fmt, chunk_size, user_id):
+    """Upsert templates from a JSONL or CSV file (matched on title + category)"""
+    fmt = fmt or ('csv' if source.name.endswith('.csv') else 'jsonl')
+    if db.session.get(UserProgress, user_id) is None:
+        raise click.ClickException(f'Unknown user {user_id}; run create-user first')
+    start = time.perf_counter()
+    try:
+        stats = library.import_templates(library.parse_templates(source, fmt), user_id, chunk_size)
+    except library.LibraryFormatError as e:
+        db.session.rollback()
+        raise click.ClickException(str(e))
+    db.session.commit()
+    summary = ', '.join(f"{value} {name.replace('_', ' ')}" for name, value in stats.items())
+    click.echo(f'Imported in {time.perf_counter() - start:.2f}s: {summary}')
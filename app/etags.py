@@ -0,0 +1,50 @@
+"""Conditional GETs for pages and API responses that rarely change.
+
+A view wrapped in conditional(stamp) first calls stamp(**view_args), which
+returns version counters covering everything the response shows (the
+user's catalog_version, a task instance's version, ...), read without
+hydrating ORM objects. Together with the user id and the build id (see
+app/assets.py) they form a strong ETag. A request whose If-None-Match
+already holds it gets an empty 304 and the view never runs; otherwise the
+view renders as usual and the ETag is attached. Responses are marked
+`private, no-cache`: browsers keep them, but revalidate on every use.
+
+Only GET and HEAD are conditional. A request with a flashed message
+waiting always renders, because the page has to show (and consume) the
+message and the ETag does not cover it.
+"""
+
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+from app.assets import build_id
+from app.users import current_user_id
+
+
+def make_etag(*parts):
+    """ETag value (unquoted) for the current user, build and version parts"""
+    return '-'.join(str(part) for part in (build_id(), current_user_id(), *parts))
+
+
+def conditional(stamp):
+    """Decorate a view to answer 304 when its version stamp is unchanged"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+                return view(**kwargs)
+
+            etag = make_etag(*stamp(**kwargs))
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,140 @@
+"""In-process pub/sub behind the live-update stream (GET /api/events).
+
+Routes publish small deltas after committing: a subtask toggled, a tier
+upgraded, a task completed, the user's XP/level/streak changed. Every open
+stream of that user in this process receives them as Server-Sent Events,
+and main.js patches the page.
+
+An idle stream is a Subscription (a bounded deque and an Event) plus
+whatever the server spends on the connection. Under gunicorn's gevent
+worker (WEB_WORKER_CLASS=gevent) the wait below is a cooperative greenlet
+wait, so one process holds thousands of idle streams; under gthread each
+stream pins a thread, so EVENTS_MAX_STREAMS caps them (gunicorn.conf.py
+reserves at most half of each worker's threads).
+
+Delivery is per process and best effort: a stream only sees events
+published by the process serving it, and a subscriber that falls more than
+QUEUE_SIZE events behind loses the oldest ones. Pages reload their data on
+reconnect, so nothing depends on receiving every event.
+"""
+
+import json
+import threading
+from collections import deque
+from itertools import count
+
+QUEUE_SIZE = 100
+HEARTBEAT_SECONDS = 15.0
+RETRY_MS = 5000
+
+
+class Subscription:
+    """One open stream's queue of (id, event, data) tuples"""
+
+    def __init__(self, user_id, size=QUEUE_SIZE):
+        self.user_id = user_id
+        self._queue = deque(maxlen=size)
+        self._ready = threading.Event()
+        self.closed = False
+
+    def put(self, item):
+        self._queue.append(item)
+        self._ready.set()
+
+    def wait(self, timeout):
+        """Everything queued, waiting up to `timeout` seconds for something"""
+        self._ready.wait(timeout)
+        self._ready.clear()
+        items = []
+        while self._queue:
+            items.append(self._queue.popleft())
+        return items
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class EventBus:
+    """Fan-out of published events to the subscriptions of one user"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user id -> set of Subscription
+        self._ids = count(1)
+        self.streams = 0
+        self.published = 0
+        self.delivered = 0
+        self.rejected = 0
+
+    def subscribe(self, user_id, max_streams=None):
+        """A new Subscription, or None if `max_streams` are already open"""
+        with self._lock:
+            if max_streams is not None and self.streams >= max_streams:
+                self.rejected += 1
+                return None
+            subscription = Subscription(user_id)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self.streams += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+            self.streams -= 1
+        subscription.close()
+
+    def has_subscribers(self, user_id):
+        """Cheap check, so callers can skip building payloads nobody will read"""
+        return user_id in self._subscribers
+
+    def publish(self, user_id, event, data):
+        """Queue an event for every stream of `user_id`; returns how many got it"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+            item = (next(self._ids), event, data)
+            self.published += 1
+            self.delivered += len(subscribers)
+        for subscription in subscribers:
+            subscription.put(item)
+        return len(subscribers)
+
+    def stats(self):
+        return {
+            'streams': self.streams,
+            'users': len(self._subscribers),
+            'published': self.published,
+            'delivered': self.delivered,
+            'rejected': self.rejected,
+        }
+
+
+bus = EventBus()
+
+
+def format_event(event_id, event, data):
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+def stream(subscription, heartbeat=HEARTBEAT_SECONDS):
+    """Yield a subscription as an SSE body until the client goes away.
+
+    Holds no app context or database session while waiting. A comment line
+    goes out every `heartbeat` seconds so dead connections are noticed
+    (the write fails) and proxies keep the stream open.
+    """
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while not subscription.closed:
+            items = subscription.wait(heartbeat)
+            if not items:
+                yield ': keep-alive\n\n'
+                continue
+            yield ''.join(format_event(*item) for item in items)
+    finally:
+        bus.unsubscribe(subscription)
@@ -0,0 +1,263 @@
+"""Cache of rendered dashboard fragments.
+
+The dashboard's progress panel, weekly category bars and completed-today
+list only change when a task is completed (the list also shows template
+titles), yet they used to be re-queried and re-rendered on every hit. The
+dashboard now renders each from its own partial template through
+FragmentCache.render(), keyed on the user and the versions it depends on:
+
+    progress, categories   user, tasks_completed, week
+    completed              user, tasks_completed, catalog_version, day
+
+Every key also carries the build id (see app/assets.py), so a deploy that
+changes a partial stops reading entries rendered from the old markup, even
+from a shared Redis.
+
+tasks_completed only moves when complete_task runs and catalog_version
+when the user's templates change, so a completion or a template edit
+selects new keys and nothing is ever deleted. Subtask toggles and tier
+upgrades are refused once an instance is completed, so together with added
+tasks they change none of these fragments and leave them cached.
+Superseded entries age out of the LRU or expire. The versions come from
+the user's cached Progress, so another process may serve the previous
+fragments for up to PROGRESS_CACHE_SECONDS, like the numbers themselves.
+
+FRAGMENT_CACHE picks the backend: 'memory' (default) is a per-process LRU
+of FRAGMENT_CACHE_SIZE entries, 'redis' shares entries between processes
+through a Redis-compatible server at FRAGMENT_CACHE_URL (expiring after
+FRAGMENT_CACHE_TTL seconds), 'none' always renders. When the server cannot
+be reached the fragment is rendered as if uncached, and the server is left
+alone for a few seconds.
+"""
+
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from flask import current_app
+from markupsafe import Markup
+
+from app.assets import build_id
+
+KEY_PREFIX = 'conquer:fragment:'
+
+
+class BackendError(Exception):
+    """The cache server failed or answered with an error"""
+
+
+class MemoryBackend:
+    """Per-process LRU of rendered fragments"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=4096):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """GET / SET EX against a Redis-compatible server (redis://[:password@]host[:port][/db]).
+
+    Speaks just enough RESP for those two commands over the standard
+    library, with one connection per calling thread. After a failure the
+    server is skipped for `retry_seconds` rather than stalling every
+    request on connect timeouts.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url, ttl=86400, timeout=0.5, retry_seconds=5.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip('/') or 0)
+        self.ttl = int(ttl)
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def get(self, key):
+        value = self._command('GET', key)
+        return None if value is None else value.decode('utf-8')
+
+    def set(self, key, html):
+        self._command('SET', key, html, 'EX', self.ttl)
+
+    def _command(self, *args):
+        if time.monotonic() < self._down_until:
+            raise BackendError('cache server marked down')
+        try:
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            return self._call(conn, args)
+        except (OSError, BackendError):
+            self._close()
+            self._down_until = time.monotonic() + self.retry_seconds
+            raise
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        conn = (sock, sock.makefile('rb'))
+        if self.password:
+            self._call(conn, ('AUTH', self.password))
+        if self.db:
+            self._call(conn, ('SELECT', self.db))
+        return conn
+
+    def _call(self, conn, args):
+        sock, reader = conn
+        parts = [str(arg).encode('utf-8') for arg in args]
+        sock.sendall(b'*%d\r\n' % len(parts) + b''.join(b'$%d\r\n%s\r\n' % (len(p), p) for p in parts))
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise BackendError('connection closed')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'-':
+            raise BackendError(body.decode('utf-8', 'replace'))
+        if kind == b'$':
+            size = int(body)
+            if size < 0:
+                return None
+            data = reader.read(size + 2)
+            if len(data) != size + 2:
+                raise BackendError('connection closed')
+            return data[:-2]
+        return body
+
+    def _close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            for part in reversed(conn):
+                try:
+                    part.close()
+                except OSError:
+                    pass
+
+
+class FragmentCache:
+    """Rendered HTML by (fragment name, version), with hit and render-time stats.
+
+    render() returns the cached HTML for a version or calls `render` to
+    produce it. Time saved is estimated per hit from the fragment's mean
+    render time over warm misses: the first render of each fragment in a
+    process also compiles its template, so it is left out. `backend` None
+    disables caching but keeps the stats.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._render_cost = {}  # fragment name -> (warm renders, their total seconds)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.render_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def render(self, name, version, render):
+        key = KEY_PREFIX + ':'.join(str(part) for part in (build_id(), name, *version))
+        html = self._get(key)
+        if html is not None:
+            with self._lock:
+                self.hits += 1
+                renders, seconds = self._render_cost.get(name, (0, 0.0))
+                if renders:
+                    self.saved_seconds += seconds / renders
+            return Markup(html)
+
+        start = time.perf_counter()
+        html = render()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.misses += 1
+            self.render_seconds += elapsed
+            if name not in self._render_cost:
+                self._render_cost[name] = (0, 0.0)  # cold: includes compiling the template
+            else:
+                renders, seconds = self._render_cost[name]
+                self._render_cost[name] = (renders + 1, seconds + elapsed)
+        self._set(key, html)
+        return Markup(html)
+
+    def _get(self, key):
+        if self.backend is None:
+            return None
+        try:
+            return self.backend.get(key)
+        except (OSError, BackendError):
+            self.errors += 1
+            return None
+
+    def _set(self, key, html):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, str(html))
+        except (OSError, BackendError):
+            self.errors += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        stats = {
+            'backend': self.backend.name if self.backend is not None else 'none',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'errors': self.errors,
+            'render_ms': round(self.render_seconds * 1000, 2),
+            'saved_ms': round(self.saved_seconds * 1000, 2),
+        }
+        if isinstance(self.backend, MemoryBackend):
+            stats['entries'] = len(self.backend)
+        return stats
+
+
+def cache_from_config(config):
+    """Build the FragmentCache selected by FRAGMENT_CACHE"""
+    kind = (config.get('FRAGMENT_CACHE') or 'memory').lower()
+    if kind == 'none':
+        return FragmentCache()
+    if kind == 'memory':
+        return FragmentCache(MemoryBackend(config.get('FRAGMENT_CACHE_SIZE', 4096)))
+    if kind == 'redis':
+        return FragmentCache(RedisBackend(config.get('FRAGMENT_CACHE_URL') or 'redis://localhost:6379/0',
+                                          ttl=config.get('FRAGMENT_CACHE_TTL', 86400)))
+    raise ValueError(f'Unknown FRAGMENT_CACHE: {kind}')
+
+
+def init_app(app):
+    app.extensions['fragments'] = cache_from_config(app.config)
+
+
+def fragment_cache():
+    """The current app's FragmentCache"""
+    return current_app.extensions['fragments']
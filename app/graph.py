@@ -1,52 +1,138 @@
-# Testing basic pixela graphing, may use for visual tracking
+"""Pluggable exporters that push daily completion counts to external graphs.
 
+Nothing here runs at import time. The app builds an exporter from config
+with exporter_from_config(); callers hand it absolute per-day totals, so
+pushing the same day twice is harmless.
+"""
 
-import requests
-from datetime import datetime
-from dotenv import load_dotenv
-import os
+import http.client
+import json
+import threading
+from urllib.parse import urlsplit
 
-load_dotenv()
 
-USERNAME = os.environ['USERNAME']
-TOKEN = os.environ['TOKEN']
-GRAPH_ID = os.environ['GRAPH_ID']
+class ExportError(Exception):
+    """An exporter could not deliver an update"""
 
-pixela_endpoint = "https://pixe.la/v1/users"
 
-# Create Graph
-graph_endpoint = f"{pixela_endpoint}/{USERNAME}/graphs"
+class GraphExporter:
+    """Base exporter: accepts updates and does nothing with them"""
 
-graph_config = {
-    "id": GRAPH_ID,
-    "name": "Conquer Tracker",
-    "unit": "tasks",
-    "type": "int",
-    "color": "ajisai",
-    "startOnMonday": True
-}
+    name = 'none'
 
-headers = {
-    "X-USER-TOKEN": TOKEN,
-}
+    def put_day(self, day, quantity):
+        """Set the total for `day` (a date) to `quantity`"""
 
-# Call to create
-# response = requests.post(url=graph_endpoint, json=graph_config, headers=headers)
-# print(response.text)
+    def close(self):
+        """Release any connections held by the exporter"""
 
-# Link to view
-# view_graph = f"{graph_endpoint}/{GRAPH_ID}.html"
 
-# Call to add value to graph
-add_data_endpoint = f"{graph_endpoint}/{GRAPH_ID}"
+class PixelaExporter(GraphExporter):
+    """Push daily totals to a Pixela graph (https://pixe.la).
 
-today = datetime.now()
-today_str = today.strftime("%Y%m%d")
+    Keeps one keep-alive connection per calling thread, so a pool of sender
+    threads reuses its sockets. `base_url` can point at a local stub server
+    for testing.
+    """
 
-add_today = {
-    "date": today_str,
-    "quantity": "3"
-}
+    name = 'pixela'
 
-response = requests.post(url=add_data_endpoint, json=add_today, headers=headers)
-print(response.text)
\ No newline at end of file
+    def __init__(self, username, token, graph_id, base_url='https://pixe.la/v1/users', timeout=10):
+        if not (username and token and graph_id):
+            raise ValueError('Pixela exporter needs PIXELA_USERNAME, PIXELA_TOKEN and PIXELA_GRAPH_ID')
+        self.username = username
+        self.token = token
+        self.graph_id = graph_id
+        self.timeout = timeout
+
+        url = urlsplit(base_url.rstrip('/'))
+        self._scheme = url.scheme
+        self._netloc = url.netloc
+        self._base_path = url.path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    @property
+    def graph_path(self):
+        return f'{self._base_path}/{self.username}/graphs/{self.graph_id}'
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self._scheme == 'https' else http.client.HTTPConnection
+            conn = cls(self._netloc, timeout=self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+
+    def _request(self, method, path, payload):
+        body = json.dumps(payload).encode()
+        headers = {'X-USER-TOKEN': self.token, 'Content-Type': 'application/json'}
+        # One retry on a fresh socket covers keep-alive connections the server closed
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                self._drop_connection()
+                if attempt:
+                    raise ExportError(f'{method} {path} failed: {e}') from e
+                continue
+
+            if response.status >= 400:
+                raise ExportError(f'{method} {path} returned {response.status}: {data[:200]!r}')
+            try:
+                return json.loads(data or b'{}')
+            except ValueError:
+                return {}
+
+    def create_graph(self, name='Conquer Tracker', color='ajisai'):
+        """Create the graph on Pixela (one-time setup)"""
+        return self._request('POST', f'{self._base_path}/{self.username}/graphs', {
+            'id': self.graph_id,
+            'name': name,
+            'unit': 'tasks',
+            'type': 'int',
+            'color': color,
+            'startOnMonday': True,
+        })
+
+    def put_day(self, day, quantity):
+        # PUT creates the pixel if missing and overwrites it otherwise
+        return self._request('PUT', f'{self.graph_path}/{day.strftime("%Y%m%d")}',
+                             {'quantity': str(quantity)})
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def exporter_from_config(config):
+    """Build the exporter selected by GRAPH_EXPORTER, or a no-op exporter"""
+    kind = (config.get('GRAPH_EXPORTER') or 'none').lower()
+    if kind == 'none':
+        return GraphExporter()
+    if kind == 'pixela':
+        return PixelaExporter(
+            username=config.get('PIXELA_USERNAME'),
+            token=config.get('PIXELA_TOKEN'),
+            graph_id=config.get('PIXELA_GRAPH_ID'),
+            base_url=config.get('PIXELA_BASE_URL') or 'https://pixe.la/v1/users',
+        )
+    raise ValueError(f'Unknown GRAPH_EXPORTER: {kind}')
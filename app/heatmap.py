@@ -0,0 +1,72 @@
+from datetime import timedelta
+from functools import lru_cache
+
+from app.models import daily_completion_totals
+
+WEEKS = 53
+CELL = 11
+GAP = 2
+STEP = CELL + GAP
+LEFT = 28
+TOP = 16
+
+# Empty cell, then four intensity levels of the primary color
+COLORS = ('#ebedf0', '#c7d2fe', '#a5b4fc', '#818cf8', '#4f46e5')
+WEEKDAY_LABELS = {0: 'Mon', 2: 'Wed', 4: 'Fri'}
+
+
+def _level(count, peak):
+    if not count or not peak:
+        return 0
+    return min(4, max(1, -(-count * 4 // peak)))
+
+
+def render_heatmap_svg(counts, end_day, weeks=WEEKS):
+    """Render a contribution-style grid of per-day counts as an SVG string.
+
+    Columns are weeks starting on Monday, ending with the week of `end_day`.
+    `counts` maps date -> number of completions.
+    """
+    start = end_day - timedelta(days=end_day.weekday() + (weeks - 1) * 7)
+    peak = max(counts.values(), default=0)
+
+    width = LEFT + weeks * STEP
+    height = TOP + 7 * STEP
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="9" fill="#6b7280">'
+    ]
+    for row, label in WEEKDAY_LABELS.items():
+        parts.append(f'<text x="0" y="{TOP + row * STEP + CELL - 2}">{label}</text>')
+
+    last_month = None
+    for week in range(weeks):
+        week_start = start + timedelta(weeks=week)
+        if week_start.month != last_month:
+            last_month = week_start.month
+            parts.append(f'<text x="{LEFT + week * STEP}" y="{TOP - 5}">{week_start.strftime("%b")}</text>')
+
+        for weekday in range(7):
+            day = week_start + timedelta(days=weekday)
+            if day > end_day:
+                break
+            count = counts.get(day, 0)
+            parts.append(
+                f'<rect x="{LEFT + week * STEP}" y="{TOP + weekday * STEP}" width="{CELL}" height="{CELL}" '
+                f'rx="2" fill="{COLORS[_level(count, peak)]}">'
+                f'<title>{day.isoformat()}: {count} quest{"" if count == 1 else "s"}</title></rect>'
+            )
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=256)
+def year_heatmap(user_id, end_day, version):
+    """SVG heatmap of a user's year ending on `end_day`, read from the daily rollup.
+
+    Cached per user and day; `version` should change whenever the user
+    records a completion (e.g. their tasks_completed) so today's cell stays
+    current.
+    """
+    start = end_day - timedelta(days=end_day.weekday() + (WEEKS - 1) * 7)
+    return render_heatmap_svg(daily_completion_totals(user_id, start, end_day), end_day)
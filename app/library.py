@@ -0,0 +1,278 @@
+"""Streaming import/export of the template library as JSONL or CSV.
+
+JSONL has one template per line with its subtasks nested:
+
+    {"title": "Clean the Kitchen", "category": "Cleaning", "task_type": "daily",
+     "effort_type": "physical", "location_type": "indoor", "base_xp_low": 15,
+     "base_xp_medium": 30, "base_xp_high": 50, "is_active": true,
+     "subtasks": [{"description": "Take out trash", "level": 1, "order": 0}, ...]}
+
+CSV has one row per subtask with the template columns repeated (a template
+without subtasks is a single row with an empty description).
+
+Both directions work in chunks, so neither holds the whole library in
+memory. Both work on one user's library. Imports upsert on the natural key
+(title, category) within that library: new templates
+and subtasks are bulk-inserted, changed ones are updated in place, and
+subtasks matched by description keep their ids (history references them).
+Subtasks missing from the import are left alone. Importing the same file
+twice changes nothing the second time.
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+
+from app import db
+from app.models import DEFAULT_USER_ID, TaskTemplate, SubTask, UserProgress
+
+TEMPLATE_FIELDS = ('title', 'category', 'task_type', 'effort_type', 'location_type',
+                   'base_xp_low', 'base_xp_medium', 'base_xp_high', 'is_active')
+# NOT NULL columns an import must supply; the rest have defaults
+REQUIRED_FIELDS = ('title', 'category', 'task_type', 'effort_type', 'location_type')
+SUBTASK_FIELDS = ('description', 'level', 'order')
+CSV_FIELDS = TEMPLATE_FIELDS + tuple(f'subtask_{name}' for name in SUBTASK_FIELDS)
+FORMATS = ('jsonl', 'csv')
+CHUNK_SIZE = 1000
+
+_DEFAULTS = {'base_xp_low': 10, 'base_xp_medium': 20, 'base_xp_high': 30, 'is_active': True}
+
+
+class LibraryFormatError(ValueError):
+    """A record in an import stream is invalid"""
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# Export
+
+def iter_templates(user_id=DEFAULT_USER_ID, chunk_size=CHUNK_SIZE):
+    """Yield a user's templates as dicts with nested subtasks, in id order, a chunk at a time"""
+    after = 0
+    while True:
+        templates = db.session.execute(
+            db.select(TaskTemplate.id, *(getattr(TaskTemplate, f) for f in TEMPLATE_FIELDS))
+            .where(TaskTemplate.user_id == user_id, TaskTemplate.id > after)
+            .order_by(TaskTemplate.id)
+            .limit(chunk_size)
+        ).all()
+        if not templates:
+            return
+        subtasks = {}
+        for row in db.session.execute(
+            db.select(SubTask.template_id, *(getattr(SubTask, f) for f in SUBTASK_FIELDS))
+            .where(SubTask.template_id.in_([row.id for row in templates]))
+            .order_by(SubTask.template_id, SubTask.order, SubTask.id)
+        ):
+            subtasks.setdefault(row.template_id, []).append({f: getattr(row, f) for f in SUBTASK_FIELDS})
+        for row in templates:
+            record = {f: getattr(row, f) for f in TEMPLATE_FIELDS}
+            record['subtasks'] = subtasks.get(row.id, [])
+            yield record
+        after = templates[-1].id
+
+
+def export_jsonl(user_id=DEFAULT_USER_ID, chunk_size=CHUNK_SIZE):
+    """Yield a user's library as JSONL lines"""
+    for record in iter_templates(user_id, chunk_size):
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def export_csv(user_id=DEFAULT_USER_ID, chunk_size=CHUNK_SIZE):
+    """Yield a user's library as CSV text, header first, one row per subtask"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(CSV_FIELDS)
+    yield flush()
+    for record in iter_templates(user_id, chunk_size):
+        template = [record[f] for f in TEMPLATE_FIELDS]
+        for subtask in record['subtasks'] or [dict.fromkeys(SUBTASK_FIELDS, '')]:
+            writer.writerow(template + [subtask[f] for f in SUBTASK_FIELDS])
+        yield flush()
+
+
+def export_templates(fmt='jsonl', user_id=DEFAULT_USER_ID, chunk_size=CHUNK_SIZE):
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format: {fmt}')
+    return export_jsonl(user_id, chunk_size) if fmt == 'jsonl' else export_csv(user_id, chunk_size)
+
+
+# Parsing
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ('0', 'false', 'no', '')
+
+
+def normalize_record(record, line):
+    """Validate one template record and coerce its types; `line` is used in errors"""
+    try:
+        template = {name: str(record.get(name) or '').strip() for name in REQUIRED_FIELDS}
+        missing = [name for name in REQUIRED_FIELDS if not template[name]]
+        if missing:
+            raise LibraryFormatError(f"Line {line}: missing {', '.join(missing)}")
+        for name in ('base_xp_low', 'base_xp_medium', 'base_xp_high'):
+            value = record.get(name)
+            template[name] = int(value) if value not in (None, '') else _DEFAULTS[name]
+        value = record.get('is_active')
+        template['is_active'] = _bool(value) if value not in (None, '') else True
+
+        subtasks = []
+        for order, subtask in enumerate(record.get('subtasks') or []):
+            description = (subtask.get('description') or '').strip()
+            if not description:
+                continue
+            level = int(subtask.get('level') or 1)
+            if level not in (1, 2, 3):
+                raise LibraryFormatError(f'Line {line}: subtask level must be 1, 2 or 3')
+            value = subtask.get('order')
+            subtasks.append({'description': description, 'level': level,
+                             'order': int(value) if value not in (None, '') else order})
+    except LibraryFormatError:
+        raise
+    except (TypeError, ValueError, AttributeError) as e:
+        raise LibraryFormatError(f'Line {line}: {e}') from e
+    template['subtasks'] = subtasks
+    return template
+
+
+def parse_jsonl(lines):
+    """Template records from an iterable of JSONL lines"""
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise LibraryFormatError(f'Line {number}: invalid JSON ({e})') from e
+        yield normalize_record(record, number)
+
+
+def parse_csv(lines):
+    """Template records from an iterable of CSV lines; a template's rows are grouped while consecutive"""
+    reader = csv.DictReader(line.decode('utf-8') if isinstance(line, bytes) else line for line in lines)
+    current, key, start = None, None, 0
+    for number, row in enumerate(reader, 2):
+        row_key = (row.get('title'), row.get('category'))
+        if row_key != key:
+            if current is not None:
+                yield normalize_record(current, start)
+            current = {f: row.get(f) for f in TEMPLATE_FIELDS}
+            current['subtasks'] = []
+            key, start = row_key, number
+        if (row.get('subtask_description') or '').strip():
+            current['subtasks'].append({f: row.get(f'subtask_{f}') for f in SUBTASK_FIELDS})
+    if current is not None:
+        yield normalize_record(current, start)
+
+
+def parse_templates(lines, fmt='jsonl'):
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format: {fmt}')
+    return parse_jsonl(lines) if fmt == 'jsonl' else parse_csv(lines)
+
+
+# Import
+
+def _upsert_chunk(records, user_id, stats):
+    # Merge duplicates inside the chunk; later records win and subtasks accumulate
+    by_key = {}
+    for record in records:
+        key = (record['title'], record['category'])
+        if key in by_key:
+            merged = by_key[key]
+            subtasks = {st['description']: st for st in merged['subtasks']}
+            subtasks.update({st['description']: st for st in record['subtasks']})
+            record = dict(record, subtasks=list(subtasks.values()))
+        by_key[key] = record
+
+    existing = {}
+    for row in db.session.execute(
+        db.select(TaskTemplate.id, *(getattr(TaskTemplate, f) for f in TEMPLATE_FIELDS))
+        .where(TaskTemplate.user_id == user_id,
+               db.tuple_(TaskTemplate.title, TaskTemplate.category).in_(list(by_key)))
+        .order_by(TaskTemplate.id)
+    ):
+        # With pre-existing duplicates the oldest row is the one kept in sync
+        existing.setdefault((row.title, row.category), row)
+
+    # New templates: one INSERT ... RETURNING for the whole chunk
+    new_keys = [key for key in by_key if key not in existing]
+    if new_keys:
+        ids = db.session.scalars(
+            db.insert(TaskTemplate).returning(TaskTemplate.id, sort_by_parameter_order=True),
+            [{'user_id': user_id, **{f: by_key[key][f] for f in TEMPLATE_FIELDS}} for key in new_keys]
+        ).all()
+        template_ids = dict(zip(new_keys, ids))
+        stats['templates_created'] += len(new_keys)
+    else:
+        template_ids = {}
+
+    # Existing templates: update only what changed
+    updates = []
+    for key, row in existing.items():
+        template_ids[key] = row.id
+        values = {f: by_key[key][f] for f in TEMPLATE_FIELDS}
+        if any(getattr(row, f) != v for f, v in values.items()):
+            updates.append({'id': row.id, **values})
+    if updates:
+        db.session.execute(db.update(TaskTemplate), updates)
+    stats['templates_updated'] += len(updates)
+    stats['templates_unchanged'] += len(existing) - len(updates)
+
+    # Subtasks, matched within each template by description
+    current = {}
+    if existing:
+        for row in db.session.execute(
+            db.select(SubTask.id, SubTask.template_id, *(getattr(SubTask, f) for f in SUBTASK_FIELDS))
+            .where(SubTask.template_id.in_([row.id for row in existing.values()]))
+        ):
+            current.setdefault((row.template_id, row.description), row)
+
+    inserts, subtask_updates = [], []
+    for key, record in by_key.items():
+        template_id = template_ids[key]
+        for subtask in record['subtasks']:
+            row = current.get((template_id, subtask['description']))
+            if row is None:
+                inserts.append({'template_id': template_id, **subtask})
+            elif row.level != subtask['level'] or row.order != subtask['order']:
+                subtask_updates.append({'id': row.id, 'level': subtask['level'], 'order': subtask['order']})
+    if inserts:
+        db.session.execute(db.insert(SubTask), inserts)
+    if subtask_updates:
+        db.session.execute(db.update(SubTask), subtask_updates)
+    stats['subtasks_created'] += len(inserts)
+    stats['subtasks_updated'] += len(subtask_updates)
+
+
+def import_templates(records, user_id=DEFAULT_USER_ID, chunk_size=CHUNK_SIZE):
+    """Upsert normalized template records (see parse_templates and
+    normalize_record) into a user's library in chunks and return counts.
+
+    Flushes per chunk and bumps the user's catalog_version if anything
+    changed, but does not commit; the caller commits once the whole stream
+    is in. Web workers pick the import up from the bumped catalog_version.
+    """
+    stats = dict.fromkeys(('templates_created', 'templates_updated', 'templates_unchanged',
+                           'subtasks_created', 'subtasks_updated'), 0)
+    for chunk in _chunks(records, chunk_size):
+        _upsert_chunk(chunk, user_id, stats)
+    if any(count for name, count in stats.items() if name != 'templates_unchanged'):
+        UserProgress.bump_catalog_version(user_id)
+    return stats
@@ -1,14 +1,19 @@
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, String, Text, ForeignKey, Boolean, Date, DateTime
+from sqlalchemy.orm import Mapped, mapped_column, relationship, joinedload, selectinload
+from sqlalchemy import Integer, String, Text, ForeignKey, Boolean, Date, DateTime, Index
+from sqlalchemy.exc import IntegrityError
 
 from flask_sqlalchemy import SQLAlchemy
 import datetime as dt
 from datetime import datetime
-from app import app, db
+from app import db
 from typing import List, Optional
 
 # db = SQLAlchemy()
 
+# Owner of data created before per-user columns existed, and of requests
+# that carry no user (see app/users.py)
+DEFAULT_USER_ID = 1
+
 # Task Categories
 CATEGORIES = [
     'Work',
@@ -34,6 +39,10 @@ class UserProgress(db.Model):
     longest_streak: Mapped[int] = mapped_column(Integer, default=0)
     last_completion_date: Mapped[dt.date] = mapped_column(Date, nullable=True)
 
+    # Bumped in the same transaction as any change to the user's templates
+    # or their subtasks; part of the ETags of pages built from the library
+    catalog_version: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+
     def calculate_level(self):
         """Calculate level based on XP (100 XP per level)"""
         return max(1, (self.total_xp // 100) + 1)
@@ -48,12 +57,92 @@ class UserProgress(db.Model):
         """Calculate progress percentage within current level"""
         return ((self.total_xp % 100) / 100) * 100
 
+    @classmethod
+    def provision(cls, user_id):
+        """Create the progress row that makes `user_id` a user.
+
+        Returns False if the user already exists. Requests never create
+        users; this runs from init-db and the create-user command. Does not
+        commit.
+        """
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(cls).values(id=user_id))
+        except IntegrityError:
+            return False
+        return True
+
+    @classmethod
+    def bump_catalog_version(cls, user_id):
+        """Record that the user's template library changed. Does not commit."""
+        db.session.execute(
+            db.update(cls).where(cls.id == user_id).values(catalog_version=cls.catalog_version + 1),
+            execution_options={'synchronize_session': False}
+        )
+
+    @classmethod
+    def catalog_stamp(cls, user_id):
+        """The user's current catalog_version, read without loading the row"""
+        return db.session.scalar(db.select(cls.catalog_version).where(cls.id == user_id))
+
+    @classmethod
+    def record_completion(cls, user_id, xp_earned, today):
+        """Award XP and advance the streak for one completed task.
+
+        Everything happens in a single UPDATE whose SET clauses only refer to
+        the row's current values, so concurrent completions cannot lose
+        updates. Streak rules: same day keeps the streak, the day after
+        extends it, anything else restarts it at 1. Does not commit.
+        """
+        yesterday = today - dt.timedelta(days=1)
+        new_streak = db.case(
+            (cls.last_completion_date == today, cls.current_streak),
+            (cls.last_completion_date == yesterday, cls.current_streak + 1),
+            else_=1
+        )
+        row = db.session.execute(
+            db.update(cls)
+            .where(cls.id == user_id)
+            .values(
+                total_xp=cls.total_xp + xp_earned,
+                tasks_completed=cls.tasks_completed + 1,
+                current_level=(cls.total_xp + xp_earned) // 100 + 1,
+                current_streak=new_streak,
+                longest_streak=db.case((new_streak > cls.longest_streak, new_streak),
+                                       else_=cls.longest_streak),
+                last_completion_date=today
+            )
+            .returning(cls.total_xp, cls.current_level, cls.tasks_completed, cls.current_streak,
+                       cls.longest_streak, cls.last_completion_date, cls.catalog_version),
+            execution_options={'synchronize_session': False}
+        ).one()
+
+        previous_level = max(1, (row.total_xp - xp_earned) // 100 + 1)
+        return {
+            'total_xp': row.total_xp,
+            'current_level': row.current_level,
+            'leveled_up': row.current_level > previous_level,
+            'tasks_completed': row.tasks_completed,
+            'current_streak': row.current_streak,
+            'longest_streak': row.longest_streak,
+            'last_completion_date': row.last_completion_date,
+            'catalog_version': row.catalog_version,
+        }
+
 
 class TaskTemplate(db.Model):
     """Template for tasks that can be instantiated multiple times"""
     __tablename__ = 'task_template'
+    __table_args__ = (
+        # Template picker: one user's active templates filtered on any prefix of the facets
+        Index('ix_task_template_user_facets', 'user_id', 'is_active', 'category', 'effort_type', 'location_type'),
+        # Natural key used by library imports to upsert (see app/library.py)
+        Index('ix_task_template_user_title_category', 'user_id', 'title', 'category'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user_progress.id'), nullable=False,
+                                         server_default=str(DEFAULT_USER_ID))
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     category: Mapped[str] = mapped_column(String(100))
     task_type: Mapped[str] = mapped_column(String(50), nullable=False) # daily, weekly, bonus
@@ -66,7 +155,7 @@ class TaskTemplate(db.Model):
     base_xp_high: Mapped[int] = mapped_column(Integer, default=30)
 
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=datetime.now(dt.timezone.utc))
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=lambda: datetime.now(dt.timezone.utc))
 
     # Relationships
     subtasks: Mapped[List['SubTask']] = relationship(back_populates='template', lazy=True, cascade='all, delete-orphan', order_by='SubTask.order')
@@ -88,10 +177,75 @@ class TaskTemplate(db.Model):
         subtask_bonus = completed_subtask_count * 2
         return base_xp + subtask_bonus
 
+    def sync_subtasks(self, submitted):
+        """Make this template's subtasks match `submitted` by diffing, not recreating.
+
+        `submitted` is the edited list in display order, as (id, description,
+        level) tuples; id is None for new rows. Rows without an id reuse an
+        unclaimed existing subtask with the same description. Unchanged
+        subtasks are not written, changed ones (including reorders) go out as
+        one batched UPDATE, new ones as one INSERT, and only removed subtasks
+        are deleted, together with their checklist rows, after which the
+        affected instances' counters are rebuilt. Instances keep their
+        checklist otherwise; added subtasks reach instances created or
+        upgraded later. Returns counts of added/updated/removed/unchanged.
+        Does not commit.
+        """
+        existing = {row.id: row for row in db.session.execute(
+            db.select(SubTask.id, SubTask.description, SubTask.level, SubTask.order)
+            .where(SubTask.template_id == self.id)
+        )}
+        by_description = {}
+        for row in sorted(existing.values(), key=lambda r: (r.order, r.id)):
+            by_description.setdefault(row.description, []).append(row.id)
+
+        claimed, updates, inserts, unchanged = set(), [], [], 0
+        for order, (subtask_id, description, level) in enumerate(submitted):
+            if subtask_id not in existing or subtask_id in claimed:
+                # New row, or a form without ids: match on description
+                subtask_id = next((i for i in by_description.get(description, ()) if i not in claimed), None)
+            if subtask_id is None:
+                inserts.append({'template_id': self.id, 'description': description, 'level': level, 'order': order})
+                continue
+            claimed.add(subtask_id)
+            row = existing[subtask_id]
+            if (row.description, row.level, row.order) == (description, level, order):
+                unchanged += 1
+            else:
+                updates.append({'id': subtask_id, 'description': description, 'level': level, 'order': order})
+
+        removed = [subtask_id for subtask_id in existing if subtask_id not in claimed]
+
+        if updates:
+            db.session.execute(db.update(SubTask), updates)
+        if inserts:
+            db.session.execute(db.insert(SubTask), inserts)
+        if removed:
+            affected = db.session.scalars(
+                db.select(SubTaskCompletion.task_instance_id)
+                .where(SubTaskCompletion.subtask_id.in_(removed)).distinct()
+            ).all()
+            db.session.execute(
+                db.delete(SubTaskCompletion).where(SubTaskCompletion.subtask_id.in_(removed)),
+                execution_options={'synchronize_session': False}
+            )
+            db.session.execute(
+                db.delete(SubTask).where(SubTask.id.in_(removed)),
+                execution_options={'synchronize_session': False}
+            )
+            if affected:
+                rebuild_completion_counts(affected)
+
+        return {'added': len(inserts), 'updated': len(updates), 'removed': len(removed), 'unchanged': unchanged}
+
 
 class SubTask(db.Model):
     """Individual sub-task belonging to a template"""
     __tablename__ = 'subtask'
+    __table_args__ = (
+        # Tier lookups: a template's subtasks up to a level
+        Index('ix_subtask_template_level', 'template_id', 'level'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     template_id: Mapped[int] = mapped_column(Integer, ForeignKey('task_template.id'), nullable=False)
@@ -111,15 +265,33 @@ class SubTask(db.Model):
 class TaskInstance(db.Model):
     """An instance of a template added to a specific day"""
     __tablename__ = 'task_instance'
+    __table_args__ = (
+        # Dashboard: one user's instances by creation range, split on completion
+        Index('ix_task_instance_user_created', 'user_id', 'created_at', 'completed_at'),
+        # Completion history: one user's completions by range, with their template
+        Index('ix_task_instance_user_completed', 'user_id', 'completed_at', 'template_id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey('user_progress.id'), nullable=False,
+                                         server_default=str(DEFAULT_USER_ID))
     template_id: Mapped[int] = mapped_column(Integer, ForeignKey('task_template.id'), nullable=False)
     selected_tier: Mapped[int] = mapped_column(Integer, nullable=False)  # 1, 2, or 3
 
-    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=datetime.now(dt.timezone.utc))
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=lambda: datetime.now(dt.timezone.utc))
     completed_at: Mapped[dt.datetime] = mapped_column(DateTime, nullable=True)
     xp_earned: Mapped[int] = mapped_column(Integer, default=0)
 
+    # Denormalized from subtask_completion so progress is a column read.
+    # Kept in step by SubTaskCompletion.toggle() and the routes that add
+    # completions; rebuild_completion_counts() repairs them from source rows.
+    completed_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    available_count: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+
+    # Bumped by every write to the instance or its checklist, so the task
+    # page's ETag changes whenever what it shows does (see version_stamp)
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+
     # Relationships
     subtask_completions: Mapped[List['SubTaskCompletion']] = relationship(back_populates='task_instance', lazy=True, cascade='all, delete-orphan')
     template: Mapped['TaskTemplate'] = relationship(back_populates='instances')
@@ -134,20 +306,108 @@ class TaskInstance(db.Model):
         """Get all subtasks available for this instance's tier"""
         return self.template.get_subtasks_for_tier(self.selected_tier)
     
-    def get_completion_status(self):
-        """Get completion stats for this instance"""
-        available = self.get_available_subtasks()
-        completed = [sc for sc in self.subtask_completions if sc.completed]
+    @classmethod
+    def claim_completion(cls, instance_id, xp_earned, completed_at=None):
+        """Mark an instance completed unless another request already did.
+
+        Returns True if this call completed it. Does not commit.
+        """
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.id == instance_id, cls.completed_at.is_(None))
+            .values(completed_at=completed_at or datetime.now(dt.timezone.utc), xp_earned=xp_earned,
+                    version=cls.version + 1),
+            execution_options={'synchronize_session': False}
+        )
+        return result.rowcount == 1
+
+    @classmethod
+    def version_stamp(cls, instance_id, user_id):
+        """(instance version, owner's catalog_version) for one of the user's
+        instances, or None. One indexed row read; nothing is hydrated.
+        """
+        return db.session.execute(
+            db.select(cls.version, UserProgress.catalog_version)
+            .join(UserProgress, UserProgress.id == cls.user_id)
+            .where(cls.id == instance_id, cls.user_id == user_id)
+        ).one_or_none()
+
+    @classmethod
+    def create_batch(cls, quests, user_id):
+        """Instantiate many (template_id, tier) pairs for `user_id` in one go.
+
+        Uses one grouped count for available subtasks, one bulk INSERT for
+        the instances and one INSERT ... SELECT for all of their completions.
+        Raises ValueError naming any unknown, inactive or foreign template ids.
+        Returns one dict per created instance, in request order. Does not commit.
+        """
+        template_ids = {template_id for template_id, _ in quests}
+        titles = dict(db.session.execute(
+            db.select(TaskTemplate.id, TaskTemplate.title)
+            .where(TaskTemplate.id.in_(template_ids), TaskTemplate.user_id == user_id,
+                   TaskTemplate.is_active.is_(True))
+        ).all())
+        missing = sorted(template_ids - titles.keys())
+        if missing:
+            raise ValueError(f'Unknown templates: {missing}')
+
+        # Subtasks per (template, level), summed into cumulative per-tier totals
+        per_level = db.session.execute(
+            db.select(SubTask.template_id, SubTask.level, db.func.count())
+            .where(SubTask.template_id.in_(template_ids))
+            .group_by(SubTask.template_id, SubTask.level)
+        ).all()
+
+        def available(template_id, tier):
+            return sum(n for t_id, level, n in per_level if t_id == template_id and level <= tier)
+
+        created = db.session.execute(
+            db.insert(cls).returning(cls.id, cls.template_id, cls.selected_tier,
+                                     sort_by_parameter_order=True),
+            [{'user_id': user_id, 'template_id': template_id, 'selected_tier': tier, 'xp_earned': 0,
+              'completed_count': 0, 'available_count': available(template_id, tier)}
+             for template_id, tier in quests]
+        ).all()
+        instance_ids = [row.id for row in created]
+
+        rows = (
+            db.select(cls.id, SubTask.id, db.literal(False))
+            .join(SubTask, db.and_(SubTask.template_id == cls.template_id,
+                                   SubTask.level <= cls.selected_tier))
+            .where(cls.id.in_(instance_ids))
+        )
+        db.session.execute(
+            db.insert(SubTaskCompletion)
+            .from_select(['task_instance_id', 'subtask_id', 'completed'], rows)
+        )
+
+        return [{
+            'id': row.id,
+            'template_id': row.template_id,
+            'title': titles[row.template_id],
+            'tier': row.selected_tier,
+            'total': available(row.template_id, row.selected_tier),
+        } for row in created]
+
+    @staticmethod
+    def completion_status(completed, total):
+        """Build the completion stats dict from raw counts"""
+        completed = completed or 0
+        total = total or 0
 
         return {
-            'total': len(available),
-            'completed': len(completed),
-            'percentage': (len(completed) / len(available) * 100) if available else 0
+            'total': total,
+            'completed': completed,
+            'percentage': (completed / total * 100) if total else 0
         }
+
+    def get_completion_status(self):
+        """Get completion stats for this instance"""
+        return self.completion_status(self.completed_count, self.available_count)
     
     def can_upgrade_tier(self):
-        """Check if user can upgrade to next tier (all current subtasks done)"""
-        if self.selected_tier >= 3:
+        """Check if user can upgrade to next tier (all current subtasks done, not yet completed)"""
+        if self.selected_tier >= 3 or self.is_completed:
             return False
         
         status = self.get_completion_status()
@@ -157,6 +417,10 @@ class TaskInstance(db.Model):
 class SubTaskCompletion(db.Model):
     """Track completion of individual subtasks within a task instance"""
     __tablename__ = 'subtask_completion'
+    __table_args__ = (
+        # One completion per subtask per instance; makes tier upgrades idempotent
+        Index('uq_subtask_completion_instance_subtask', 'task_instance_id', 'subtask_id', unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     task_instance_id: Mapped[int] = mapped_column(Integer, ForeignKey('task_instance.id'), nullable=False)
@@ -169,46 +433,323 @@ class SubTaskCompletion(db.Model):
     task_instance: Mapped['TaskInstance'] = relationship(back_populates='subtask_completions')
 
     def toggle(self):
-        """Toggle completion status"""
+        """Toggle completion status and adjust the instance's completed_count"""
         self.completed = not self.completed
         self.completed_at = datetime.now(dt.timezone.utc) if self.completed else None
 
+        # Relative UPDATE in the same transaction, so concurrent toggles
+        # on one instance cannot overwrite each other's counts
+        db.session.execute(
+            db.update(TaskInstance)
+            .where(TaskInstance.id == self.task_instance_id)
+            .values(completed_count=TaskInstance.completed_count + (1 if self.completed else -1),
+                    version=TaskInstance.version + 1)
+        )
+
+    @classmethod
+    def add_for_tier(cls, instance_id, template_id, tier):
+        """Create the missing completions for every subtask up to `tier`.
+
+        A single INSERT ... SELECT from subtask, skipping subtasks the
+        instance already has, so it is safe to repeat. Bumps the instance's
+        available_count by the number of rows added and returns that number.
+        Does not commit.
+        """
+        already_added = (
+            db.select(cls.id)
+            .where(cls.task_instance_id == instance_id, cls.subtask_id == SubTask.id)
+            .exists()
+        )
+        rows = (
+            db.select(db.literal(instance_id), SubTask.id, db.literal(False))
+            .where(SubTask.template_id == template_id, SubTask.level <= tier, ~already_added)
+        )
+        added = db.session.execute(
+            db.insert(cls).from_select(['task_instance_id', 'subtask_id', 'completed'], rows)
+        ).rowcount
+
+        if added:
+            db.session.execute(
+                db.update(TaskInstance)
+                .where(TaskInstance.id == instance_id)
+                .values(available_count=TaskInstance.available_count + added, version=TaskInstance.version + 1)
+            )
+        return added
+
+    @classmethod
+    def toggle_by_id(cls, instance_id, completion_id, user_id):
+        """Flip a completion without loading it and return the instance's new state.
+
+        The completion row is flipped by a single UPDATE ... RETURNING, then the
+        instance counter is adjusted the same way. Returns None if the
+        completion does not belong to the instance, the instance to
+        `user_id`, or the instance is already completed (its checklist is
+        final). Does not commit.
+        """
+        owned = db.select(TaskInstance.id).where(TaskInstance.id == instance_id, TaskInstance.user_id == user_id,
+                                                 TaskInstance.completed_at.is_(None))
+        flipped = db.session.execute(
+            db.update(cls)
+            .where(cls.id == completion_id, cls.task_instance_id == instance_id,
+                   cls.task_instance_id.in_(owned))
+            .values(
+                completed=db.not_(cls.completed),
+                completed_at=db.case((cls.completed.is_(True), None),
+                                     else_=datetime.now(dt.timezone.utc))
+            )
+            .returning(cls.completed),
+            execution_options={'synchronize_session': False}
+        ).first()
+        if flipped is None:
+            return None
+
+        completed = flipped.completed
+        instance = db.session.execute(
+            db.update(TaskInstance)
+            .where(TaskInstance.id == instance_id)
+            .values(completed_count=TaskInstance.completed_count + (1 if completed else -1),
+                    version=TaskInstance.version + 1)
+            .returning(TaskInstance.completed_count, TaskInstance.available_count,
+                       TaskInstance.selected_tier, TaskInstance.completed_at),
+            execution_options={'synchronize_session': False}
+        ).one()
+
+        status = TaskInstance.completion_status(instance.completed_count, instance.available_count)
+        return {
+            'completion_id': completion_id,
+            'completed': completed,
+            'status': status,
+            'can_upgrade_tier': instance.selected_tier < 3 and status['percentage'] == 100,
+            'can_complete': status['percentage'] >= 50,
+        }
 
-# Create table schema in db. Requires app context
-with app.app_context():
-    db.create_all()
-
-# def init_db(app):
-#     """Initialize db and Create tables and user if none"""
-#     # db.init_app(app)
-
-#     with app.app_context():
-#         db.create_all()
-
-#         # Create default user progress if not exists
-#         if not UserProgress.query.first():
-#             user = UserProgress(
-#                 total_xp=0,
-#                 current_level=1,
-#                 tasks_completed=0,
-#                 current_streak=0,
-#                 longest_streak=0
-#             )
-#             db.session.add(user)
-#             db.session.commit()
-
-def get_or_create_user():
-    """Get the user progress record (single user system)"""
-    user = UserProgress.query.first()
-    if not user:
-        user = UserProgress(
-            total_xp=0,
-            current_level=1,
-            tasks_completed=0,
-            current_streak=0,
-            longest_streak=0
+
+class DailyStat(db.Model):
+    """Per-user, per-day, per-category rollup of completed task instances.
+
+    Maintained incrementally by complete_task via record(); rebuilt from
+    task_instance by the backfill-daily-stats command. Days are the UTC date
+    of completed_at, matching how instances are stored. (The table replaced
+    the single-user `daily_stats`; init-db fills it on upgrade.)
+    """
+    __tablename__ = 'daily_user_stats'
+
+    user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[dt.date] = mapped_column(Date, primary_key=True)
+    category: Mapped[str] = mapped_column(String(100), primary_key=True)
+    completions: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    xp: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+
+    # Completions per selected tier
+    tier_low: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    tier_medium: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    tier_high: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+
+    TIER_COLUMNS = {1: 'tier_low', 2: 'tier_medium', 3: 'tier_high'}
+
+    @classmethod
+    def record(cls, user_id, day, category, xp_earned, tier):
+        """Add one completion to the (user, day, category) row, creating it if needed.
+
+        Relative UPDATE first; if no row exists, INSERT in a savepoint and
+        fall back to the UPDATE if a concurrent request inserted it first.
+        Does not commit.
+        """
+        tier_column = cls.TIER_COLUMNS.get(tier, 'tier_low')
+        increment = (
+            db.update(cls)
+            .where(cls.user_id == user_id, cls.day == day, cls.category == category)
+            .values({
+                cls.completions: cls.completions + 1,
+                cls.xp: cls.xp + xp_earned,
+                getattr(cls, tier_column): getattr(cls, tier_column) + 1,
+            })
+        )
+        options = {'synchronize_session': False}
+        if db.session.execute(increment, execution_options=options).rowcount:
+            return
+
+        row = {'user_id': user_id, 'day': day, 'category': category, 'completions': 1, 'xp': xp_earned,
+               'tier_low': 0, 'tier_medium': 0, 'tier_high': 0}
+        row[tier_column] = 1
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(cls).values(row))
+        except IntegrityError:
+            db.session.execute(increment, execution_options=options)
+
+    @classmethod
+    def rebuild(cls):
+        """Replace every rollup row with aggregates over task_instance.
+
+        Returns the number of rows written. Does not commit.
+        """
+        def tier_count(tier):
+            return db.func.sum(db.case((TaskInstance.selected_tier == tier, 1), else_=0))
+
+        day = db.func.date(TaskInstance.completed_at)
+        aggregates = (
+            db.select(TaskInstance.user_id, day, TaskTemplate.category, db.func.count(TaskInstance.id),
+                      db.func.coalesce(db.func.sum(TaskInstance.xp_earned), 0),
+                      tier_count(1), tier_count(2), tier_count(3))
+            .join(TaskInstance.template)
+            .where(TaskInstance.completed_at.isnot(None))
+            .group_by(TaskInstance.user_id, day, TaskTemplate.category)
         )
-        db.session.add(user)
-        db.session.commit()
-    return user
+        db.session.execute(db.delete(cls))
+        return db.session.execute(
+            db.insert(cls).from_select(
+                ['user_id', 'day', 'category', 'completions', 'xp', 'tier_low', 'tier_medium', 'tier_high'],
+                aggregates
+            )
+        ).rowcount
+
+
+class GraphOutbox(db.Model):
+    """Transactional outbox of days whose totals need pushing to the external graph.
+
+    complete_task adds a row in the same transaction as the completion; the
+    outbox worker (app/outbox.py) drains pending rows in the background.
+    """
+    __tablename__ = 'graph_outbox'
+    __table_args__ = (
+        # Pending rows that are due: sent_at IS NULL AND next_attempt_at <= now
+        Index('ix_graph_outbox_pending', 'sent_at', 'next_attempt_at'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[dt.date] = mapped_column(Date, nullable=False)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=lambda: datetime.now(dt.timezone.utc))
+    next_attempt_at: Mapped[dt.datetime] = mapped_column(DateTime, default=lambda: datetime.now(dt.timezone.utc))
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    sent_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(String(500), nullable=True)
+
+
+# Loading policy
+# Relationships stay lazy by default; each route passes one of these option
+# sets so everything it renders is fetched in a fixed number of statements
+# instead of one lazy load per row (N+1).
+
+# Dashboard cards: template title/category (progress comes from counters)
+DASHBOARD_INSTANCE_LOADING = (
+    joinedload(TaskInstance.template),
+)
+
+# Task detail: checklist rows render their subtask description and level
+TASK_DETAIL_LOADING = (
+    joinedload(TaskInstance.template),
+    selectinload(TaskInstance.subtask_completions).joinedload(SubTaskCompletion.subtask),
+)
+
+# Template listings show subtask counts and previews
+TEMPLATE_LIST_LOADING = (
+    selectinload(TaskTemplate.subtasks),
+)
+
+
+def rebuild_completion_counts(instance_ids=None):
+    """Recompute completed_count/available_count from subtask_completion rows.
+
+    Rebuilds every instance, or only `instance_ids` when given. Returns the
+    number of instances updated. Does not commit.
+    """
+    completions = SubTaskCompletion.__table__
+    available = (
+        db.select(db.func.count())
+        .where(completions.c.task_instance_id == TaskInstance.id)
+        .scalar_subquery()
+    )
+    completed = (
+        db.select(db.func.count())
+        .where(completions.c.task_instance_id == TaskInstance.id, completions.c.completed.is_(True))
+        .scalar_subquery()
+    )
+    stmt = db.update(TaskInstance).values(available_count=available, completed_count=completed,
+                                          version=TaskInstance.version + 1)
+    if instance_ids is not None:
+        stmt = stmt.where(TaskInstance.id.in_(instance_ids))
+    return db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+
+
+# Template dimensions the picker can filter and count on
+TEMPLATE_FACETS = ('category', 'effort_type', 'location_type')
+
+
+def _active_templates_where(user_id, filters, skip=None):
+    """WHERE clauses for a user's active templates matching `filters`, minus the `skip` facet"""
+    clauses = [TaskTemplate.user_id == user_id, TaskTemplate.is_active.is_(True)]
+    for facet, value in filters.items():
+        if facet != skip:
+            clauses.append(getattr(TaskTemplate, facet) == value)
+    return clauses
+
+
+def filter_templates_page(user_id, filters, after=None, limit=50):
+    """One keyset page of a user's active templates matching `filters`, in id order.
+
+    Each row carries its subtask count from a correlated subquery. Returns
+    (rows, next_after) where next_after is the id to pass as `after` for the
+    following page, or None on the last page.
+    """
+    subtask_count = (
+        db.select(db.func.count(SubTask.id))
+        .where(SubTask.template_id == TaskTemplate.id)
+        .scalar_subquery()
+        .label('subtask_count')
+    )
+    stmt = (
+        db.select(TaskTemplate.id, TaskTemplate.title, TaskTemplate.category, TaskTemplate.task_type,
+                  TaskTemplate.effort_type, TaskTemplate.location_type, subtask_count)
+        .where(*_active_templates_where(user_id, filters))
+        .order_by(TaskTemplate.id)
+        .limit(limit + 1)
+    )
+    if after is not None:
+        stmt = stmt.where(TaskTemplate.id > after)
+
+    rows = db.session.execute(stmt).all()
+    next_after = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_after
+
+
+def template_facet_counts(user_id, filters):
+    """Counts per value of each facet over a user's templates, one GROUP BY per facet.
+
+    Each facet is counted with every other filter applied but not its own,
+    so the picker can show how many results each alternative would give.
+    """
+    facets = {}
+    for facet in TEMPLATE_FACETS:
+        column = getattr(TaskTemplate, facet)
+        facets[facet] = dict(db.session.execute(
+            db.select(column, db.func.count())
+            .where(*_active_templates_where(user_id, filters, skip=facet))
+            .group_by(column)
+        ).all())
+    return facets
+
+
+def category_completion_counts(user_id, first_day, last_day):
+    """Count a user's instances completed from first_day to last_day (inclusive) per category.
+
+    Reads the daily rollup, so the cost depends on the number of days and
+    categories rather than on the size of task_instance.
+    """
+    rows = db.session.execute(
+        db.select(DailyStat.category, db.func.sum(DailyStat.completions))
+        .where(DailyStat.user_id == user_id, DailyStat.day >= first_day, DailyStat.day <= last_day)
+        .group_by(DailyStat.category)
+    ).all()
+    return {category: count for category, count in rows}
+
+
+def daily_completion_totals(user_id, first_day, last_day):
+    """A user's completions per day from first_day to last_day (inclusive), from the rollup"""
+    rows = db.session.execute(
+        db.select(DailyStat.day, db.func.sum(DailyStat.completions))
+        .where(DailyStat.user_id == user_id, DailyStat.day >= first_day, DailyStat.day <= last_day)
+        .group_by(DailyStat.day)
+    ).all()
+    return {day: count for day, count in rows}
 
@@ -0,0 +1,261 @@
+"""Background delivery of the graph outbox.
+
+complete_task writes a GraphOutbox row for the completion's day inside its
+own transaction. OutboxWorker drains due rows off the request path:
+
+- all pending rows for the same day collapse into one absolute "quantity"
+  update, read from the daily rollup of the GRAPH_SYNC_USER_ID user (the
+  graph belongs to one account, so complete_task only queues that user's
+  completions);
+- days are sent concurrently from a small thread pool through the
+  configured exporter, which keeps a keep-alive connection per thread;
+- failures are retried with exponential backoff until max_attempts.
+
+Every web process may run a worker (OUTBOX_IN_PROCESS), so a worker claims
+the due rows it selected before sending: one UPDATE pushes their
+next_attempt_at out by `lease` seconds, and only the rows it actually moved
+are sent. Rows whose worker died mid-send become due again once the lease
+runs out.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+
+from app import db
+from app.graph import exporter_from_config
+from app.models import DEFAULT_USER_ID, GraphOutbox, daily_completion_totals
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class OutboxWorker:
+    """Drains GraphOutbox rows through an exporter, in batches, with retry"""
+
+    def __init__(self, app, exporter=None, batch_size=200, senders=4, poll_interval=2.0,
+                 max_attempts=None, base_backoff=2.0, max_backoff=600.0, lease=120.0):
+        self.app = app
+        self.exporter = exporter or exporter_from_config(app.config)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts or app.config.get('OUTBOX_MAX_ATTEMPTS', 8)
+        self.lease = lease
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._pool = ThreadPoolExecutor(max_workers=senders, thread_name_prefix='outbox-send')
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.batches = 0
+        self.rows_sent = 0
+        self.updates_sent = 0
+        self.updates_failed = 0
+        self.last_batch_seconds = None
+        self.send_seconds_total = 0.0
+        self.last_error = None
+
+    # Sending
+
+    def _send(self, day, quantity):
+        start = time.perf_counter()
+        try:
+            self.exporter.put_day(day, quantity)
+            return None, time.perf_counter() - start
+        except Exception as e:  # exporter errors are recorded and retried
+            return str(e)[:500], time.perf_counter() - start
+
+    def _claim(self, now):
+        """Due rows this worker now holds for `lease` seconds; other workers skip them"""
+        due = [id_ for id_, in db.session.execute(
+            db.select(GraphOutbox.id)
+            .where(GraphOutbox.sent_at.is_(None),
+                   GraphOutbox.next_attempt_at <= now,
+                   GraphOutbox.attempts < self.max_attempts)
+            .order_by(GraphOutbox.id)
+            .limit(self.batch_size)
+        )]
+        if not due:
+            db.session.rollback()
+            return []
+        # Re-checks the due condition, so rows another worker claimed since
+        # the SELECT are not updated, and not returned
+        rows = db.session.execute(
+            db.update(GraphOutbox)
+            .where(GraphOutbox.id.in_(due), GraphOutbox.sent_at.is_(None), GraphOutbox.next_attempt_at <= now)
+            .values(next_attempt_at=now + timedelta(seconds=self.lease))
+            .returning(GraphOutbox.id, GraphOutbox.day, GraphOutbox.attempts),
+            execution_options={'synchronize_session': False}
+        ).all()
+        db.session.commit()
+        return rows
+
+    def drain_once(self):
+        """Claim and send one batch of due rows. Returns the number of rows processed."""
+        started = time.perf_counter()
+        with self.app.app_context():
+            rows = self._claim(_now())
+            if not rows:
+                return 0
+
+            # Coalesce: one absolute update per day, however many completions
+            by_day = defaultdict(list)
+            for row in rows:
+                by_day[row.day].append(row)
+            totals = daily_completion_totals(sync_user_id(self.app), min(by_day), max(by_day))
+            # Release the read transaction while HTTP is in flight
+            db.session.rollback()
+
+            futures = {day: self._pool.submit(self._send, day, totals.get(day, 0)) for day in by_day}
+
+            for day, future in futures.items():
+                error, seconds = future.result()
+                ids = [row.id for row in by_day[day]]
+                with self._lock:
+                    self.send_seconds_total += seconds
+                    if error is None:
+                        self.updates_sent += 1
+                        self.rows_sent += len(ids)
+                    else:
+                        self.updates_failed += 1
+                        self.last_error = error
+
+                if error is None:
+                    db.session.execute(
+                        db.update(GraphOutbox).where(GraphOutbox.id.in_(ids)).values(sent_at=_now())
+                    )
+                else:
+                    attempts = max(row.attempts for row in by_day[day]) + 1
+                    delay = min(self.base_backoff * 2 ** (attempts - 1), self.max_backoff)
+                    db.session.execute(
+                        db.update(GraphOutbox).where(GraphOutbox.id.in_(ids)).values(
+                            attempts=GraphOutbox.attempts + 1,
+                            next_attempt_at=_now() + timedelta(seconds=delay),
+                            last_error=error
+                        )
+                    )
+            db.session.commit()
+
+        with self._lock:
+            self.batches += 1
+            self.last_batch_seconds = time.perf_counter() - started
+        return len(rows)
+
+    def prune(self, older_than=timedelta(days=1)):
+        """Delete rows that were delivered more than `older_than` ago"""
+        with self.app.app_context():
+            deleted = db.session.execute(
+                db.delete(GraphOutbox).where(GraphOutbox.sent_at < _now() - older_than)
+            ).rowcount
+            db.session.commit()
+        return deleted
+
+    # Lifecycle
+
+    def _run(self):
+        last_prune = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                processed = self.drain_once()
+                if time.monotonic() - last_prune > 3600:
+                    self.prune()
+                    last_prune = time.monotonic()
+            except Exception as e:  # keep the worker alive across DB hiccups
+                self.last_error = str(e)[:500]
+                self.app.logger.exception('Graph outbox batch failed')
+                processed = 0
+            # A full batch means more is probably waiting
+            if processed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """Run the drain loop in a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='graph-outbox', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._pool.shutdown(wait=True)
+        self.exporter.close()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def metrics(self):
+        with self._lock:
+            sends = self.updates_sent + self.updates_failed
+            return {
+                'running': self.running,
+                'batches': self.batches,
+                'rows_sent': self.rows_sent,
+                'updates_sent': self.updates_sent,
+                'updates_failed': self.updates_failed,
+                'avg_send_ms': round(self.send_seconds_total / sends * 1000, 2) if sends else None,
+                'last_batch_ms': round(self.last_batch_seconds * 1000, 2) if self.last_batch_seconds is not None else None,
+                'last_error': self.last_error,
+            }
+
+
+def queue_metrics(max_attempts=None):
+    """Depth and age of the outbox queue, read from the database.
+
+    Rows that used up `max_attempts` (default OUTBOX_MAX_ATTEMPTS, the
+    workers' limit) count as dead rather than pending.
+    """
+    max_attempts = max_attempts or current_app.config.get('OUTBOX_MAX_ATTEMPTS', 8)
+    now = _now()
+    pending = db.session.execute(
+        db.select(db.func.count(GraphOutbox.id), db.func.min(GraphOutbox.created_at))
+        .where(GraphOutbox.sent_at.is_(None), GraphOutbox.attempts < max_attempts)
+    ).one()
+    dead = db.session.scalar(
+        db.select(db.func.count(GraphOutbox.id))
+        .where(GraphOutbox.sent_at.is_(None), GraphOutbox.attempts >= max_attempts)
+    )
+    oldest = pending[1]
+    if oldest is not None and oldest.tzinfo is None:
+        oldest = oldest.replace(tzinfo=timezone.utc)
+    return {
+        'depth': pending[0],
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 1) if oldest else None,
+        'dead': dead,
+    }
+
+
+# The in-process worker, started on the first request when an exporter is configured
+worker = None
+_worker_lock = threading.Lock()
+
+
+def ensure_worker(app):
+    """Start this process's outbox worker once, if sync is enabled"""
+    global worker
+    if worker is not None or not outbox_enabled(app) or not app.config.get('OUTBOX_IN_PROCESS', True):
+        return worker
+    with _worker_lock:
+        if worker is None:
+            worker = OutboxWorker(app).start()
+    return worker
+
+
+def outbox_enabled(app):
+    return (app.config.get('GRAPH_EXPORTER') or 'none').lower() != 'none'
+
+
+def sync_user_id(app):
+    """The user whose completions are pushed to the external graph"""
+    return app.config.get('GRAPH_SYNC_USER_ID', DEFAULT_USER_ID)
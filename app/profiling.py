@@ -0,0 +1,287 @@
+"""Opt-in request profiling (PROFILING=1).
+
+For every request this records wall time, the number of SQL statements and
+the time spent in them (SQLAlchemy cursor events), and template render time
+(Flask's template signals). Each response gets a Server-Timing header, and
+/debug/perf shows per-endpoint aggregates plus the most recent requests.
+
+With PROFILING_SAMPLE_RATE > 0 (or `?_profile=1` on a request) a sampler
+thread also records the request thread's stack every few milliseconds.
+/debug/perf/stacks returns them in folded format, one `frame;frame;frame
+count` line per stack, ready for flamegraph.pl or speedscope.
+
+Endpoints whose query count goes over QUERY_BUDGETS are logged as warnings
+and highlighted on the page, which is how an N+1 regression shows up.
+"""
+
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+from flask import (Blueprint, Response, current_app, g, has_request_context, jsonify, redirect, render_template,
+                   request, url_for)
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+
+from app import db
+
+# Statements per request each route is expected to stay within (see
+# benchmarks/query_counts.py); a miss in the progress cache adds one more
+QUERY_BUDGETS = {
+    'main.dashboard': 4,
+    'main.task_detail': 4,
+    'main.templates_list': 3,
+    'main.filter_templates': 6,
+}
+
+RECENT_REQUESTS = 100
+
+bp = Blueprint('perf', __name__, url_prefix='/debug/perf')
+
+
+class RequestTimings:
+    """Timings for the current request, kept on flask.g"""
+
+    __slots__ = ('started', 'sql_count', 'sql_seconds', 'render_seconds', 'render_started', 'sampler')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+        self.render_started = []
+        self.sampler = None
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval, in folded form"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='perf-sampler', daemon=True)
+
+    @staticmethod
+    def fold(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_filename.rsplit("/", 1)[-1]}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.fold(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class PerfStore:
+    """Per-process aggregates, recent requests and sampled stacks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.recent = deque(maxlen=RECENT_REQUESTS)
+            self.endpoints = defaultdict(lambda: {
+                'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'queries': 0, 'max_queries': 0,
+                'sql_ms': 0.0, 'render_ms': 0.0, 'over_budget': 0,
+            })
+            self.stacks = defaultdict(Counter)
+
+    def record(self, entry, stacks=None):
+        with self._lock:
+            self.recent.appendleft(entry)
+            agg = self.endpoints[entry['endpoint']]
+            agg['requests'] += 1
+            agg['total_ms'] += entry['total_ms']
+            agg['max_ms'] = max(agg['max_ms'], entry['total_ms'])
+            agg['queries'] += entry['queries']
+            agg['max_queries'] = max(agg['max_queries'], entry['queries'])
+            agg['sql_ms'] += entry['sql_ms']
+            agg['render_ms'] += entry['render_ms']
+            agg['over_budget'] += entry['over_budget']
+            if stacks:
+                self.stacks[entry['endpoint']].update(stacks)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = []
+            for name, agg in self.endpoints.items():
+                n = agg['requests']
+                endpoints.append({
+                    'endpoint': name,
+                    'requests': n,
+                    'avg_ms': round(agg['total_ms'] / n, 2),
+                    'max_ms': round(agg['max_ms'], 2),
+                    'avg_queries': round(agg['queries'] / n, 2),
+                    'max_queries': agg['max_queries'],
+                    'query_budget': QUERY_BUDGETS.get(name),
+                    'over_budget': agg['over_budget'],
+                    'avg_sql_ms': round(agg['sql_ms'] / n, 2),
+                    'avg_render_ms': round(agg['render_ms'] / n, 2),
+                    'sampled_stacks': sum(self.stacks[name].values()),
+                })
+            endpoints.sort(key=lambda e: e['avg_ms'] * e['requests'], reverse=True)
+            return {'endpoints': endpoints, 'recent': list(self.recent)}
+
+    def folded(self, endpoint=None):
+        with self._lock:
+            counters = [self.stacks[endpoint]] if endpoint else list(self.stacks.values())
+            merged = Counter()
+            for counter in counters:
+                merged.update(counter)
+        return ''.join(f'{stack} {count}\n' for stack, count in merged.most_common())
+
+
+store = PerfStore()
+
+
+def _timings():
+    return g.get('_perf') if has_request_context() else None
+
+
+# SQL
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('perf_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['perf_started'].pop()
+    timings = _timings()
+    if timings is not None:
+        timings.sql_count += 1
+        timings.sql_seconds += time.perf_counter() - started
+
+
+def _handle_error(context):
+    # after_cursor_execute does not fire for failed statements
+    started = context.connection.info.get('perf_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+# Templates
+
+def _before_render(sender, template, context, **extra):
+    timings = _timings()
+    if timings is not None:
+        timings.render_started.append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    timings = _timings()
+    if timings is not None and timings.render_started:
+        elapsed = time.perf_counter() - timings.render_started.pop()
+        # Only top-level renders count; nested ones are inside the outer time
+        if not timings.render_started:
+            timings.render_seconds += elapsed
+
+
+# Request lifecycle
+
+def _start_request():
+    if request.blueprint == 'perf' or request.endpoint == 'static':
+        return
+    g._perf = timings = RequestTimings()
+    config = current_app.config
+    if request.args.get('_profile') == '1' or random.random() < config.get('PROFILING_SAMPLE_RATE', 0.0):
+        interval = config.get('PROFILING_SAMPLE_INTERVAL_MS', 5.0) / 1000
+        timings.sampler = StackSampler(threading.get_ident(), interval).start()
+
+
+def _finish_request(response):
+    timings = g.pop('_perf', None)
+    if timings is None:
+        return response
+    stacks = timings.sampler.stop() if timings.sampler is not None else None
+
+    total_ms = (time.perf_counter() - timings.started) * 1000
+    sql_ms = timings.sql_seconds * 1000
+    render_ms = timings.render_seconds * 1000
+    endpoint = request.endpoint or '<unmatched>'
+    budget = QUERY_BUDGETS.get(endpoint)
+    over_budget = budget is not None and timings.sql_count > budget
+    if over_budget:
+        current_app.logger.warning('%s ran %d SQL statements (budget %d)', endpoint, timings.sql_count, budget)
+
+    response.headers.add(
+        'Server-Timing',
+        f'app;dur={total_ms:.1f}, sql;desc="{timings.sql_count} queries";dur={sql_ms:.1f}, '
+        f'render;dur={render_ms:.1f}'
+    )
+    store.record({
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'status': response.status_code,
+        'total_ms': round(total_ms, 2),
+        'queries': timings.sql_count,
+        'sql_ms': round(sql_ms, 2),
+        'render_ms': round(render_ms, 2),
+        'over_budget': over_budget,
+        'sampled': stacks is not None,
+    }, stacks)
+    return response
+
+
+def _teardown_request(exc):
+    # after_request is skipped on unhandled errors; make sure the sampler stops
+    timings = g.pop('_perf', None)
+    if timings is not None and timings.sampler is not None:
+        timings.sampler.stop()
+
+
+# Views
+
+@bp.route('')
+def perf_page():
+    """Per-endpoint timings and recent requests (add ?format=json for JSON)"""
+    data = store.snapshot()
+    if request.args.get('format') == 'json':
+        return jsonify(data)
+    return render_template('debug_perf.html', **data)
+
+
+@bp.route('/stacks')
+def perf_stacks():
+    """Sampled stacks in folded format, optionally for one ?route=<endpoint>"""
+    return Response(store.folded(request.args.get('route')), mimetype='text/plain')
+
+
+@bp.route('/reset', methods=['POST'])
+def perf_reset():
+    store.reset()
+    return redirect(url_for('perf.perf_page'))
+
+
+def init_app(app):
+    """Install the profiling hooks and the /debug/perf pages on `app`"""
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(db.engine, 'handle_error', _handle_error)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+    app.register_blueprint(bp)
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+
+from app import db
+
+
+class QueryCounter:
+    """Collects every SQL statement executed on an engine while active"""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Count SQL statements run inside the block.
+
+    Usage:
+        with count_queries() as counter:
+            client.get('/')
+        print(counter.count)
+    """
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter._before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Fail if the block runs more than `limit` SQL statements"""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = '\n'.join(f'  {i}. {sql}' for i, sql in enumerate(counter.statements, 1))
+        raise AssertionError(f'Expected at most {limit} queries, got {counter.count}:\n{listing}')
@@ -1,67 +1,190 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import (Blueprint, Response, abort, current_app, render_template, request, jsonify, redirect, url_for,
+                   flash, stream_with_context)
 from datetime import datetime, date, timedelta
 import datetime as dt
-from app import app, db
+import functools
+import io
+from app import db
+from app import library
+from app.catalog import catalog
+from app.etags import conditional
+from app.heatmap import year_heatmap
+from app.events import bus as event_bus, stream as event_stream
+from app.fragments import fragment_cache
+from app import outbox
+from app.users import current_user_id, current_progress, remember_progress, progress_cache
 from app.models import (
-    get_or_create_user, 
     TaskTemplate, SubTask, TaskInstance, SubTaskCompletion,
-    UserProgress, CATEGORIES
+    UserProgress, DailyStat, GraphOutbox, CATEGORIES, category_completion_counts,
+    TEMPLATE_FACETS, filter_templates_page, template_facet_counts,
+    DASHBOARD_INSTANCE_LOADING, TASK_DETAIL_LOADING
 )
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+bp = Blueprint('main', __name__)
+
+# Upper bound for one /api/plan request
+MAX_PLAN_SIZE = 100
+
+# Template filter API page sizes
+FILTER_PAGE_SIZE = 50
+MAX_FILTER_PAGE_SIZE = 200
+
 # Initialize db on startup
 # init_db(app)
 
 
-@app.route('/')
-def dashboard():
-    """Main dashboard view"""
-    user = get_or_create_user()
+@bp.before_app_request
+def start_background_workers():
+    """Start the graph outbox worker on the first request, if sync is enabled"""
+    outbox.ensure_worker(current_app._get_current_object())
+
+
+def owned_template_or_404(template_id):
+    """The current user's template, or 404 (also for other users' templates)"""
+    return TaskTemplate.query.filter_by(id=template_id, user_id=current_user_id()).first_or_404()
+
+
+def owned_instance_or_404(instance_id, *options):
+    """The current user's task instance, or 404 (also for other users' instances)"""
+    return (TaskInstance.query.options(*options)
+            .filter_by(id=instance_id, user_id=current_user_id()).first_or_404())
+
+
+def templates_stamp():
+    """The catalog_version templates_list renders, from the cached Progress"""
+    return (current_progress().catalog_version,)
 
-    # Get today's active task instances
-    today_instances = TaskInstance.query.filter(
-        db.func.date(TaskInstance.created_at) == date.today()
-    ).all()
 
-    # Separate by completion status
-    active_tasks = [t for t in today_instances if not t.is_completed]
-    completed_tasks = [t for t in today_instances if t.is_completed]
+def library_stamp():
+    """The user's catalog_version as stored, for responses read from the database"""
+    return (UserProgress.catalog_stamp(current_user_id()),)
 
-    # Get weekly stats
-    week_start = date.today() - timedelta(days=date.today().weekday())
-    weekly_completions = TaskInstance.query.filter(
-        TaskInstance.completed_at.isnot(None),
-        db.func.date(TaskInstance.completed_at) >= week_start
+
+def instance_stamp(instance_id):
+    """Instance and catalog versions for task_detail; 404 for other users' instances"""
+    stamp = TaskInstance.version_stamp(instance_id, current_user_id())
+    if stamp is None:
+        abort(404)
+    return tuple(stamp)
+
+
+def library_changed(user_id):
+    """Reload the user's Progress after committing a template change.
+
+    Its catalog_version keys the template catalog and dashboard fragments,
+    so this process serves the new library from the next request on.
+    """
+    progress_cache.invalidate(user_id)
+
+
+def publish(user_id, event, make_data):
+    """Push a live update to the user's open event streams (see app/events.py).
+
+    `make_data` is only called when someone is listening, so routes can
+    pass payloads that cost a query to build. Call after committing.
+    """
+    if event_bus.has_subscribers(user_id):
+        event_bus.publish(user_id, event, make_data())
+
+
+def instance_state(instance):
+    """Progress of one task instance, as sent in live updates"""
+    status = instance.get_completion_status()
+    return {
+        'instance_id': instance.id,
+        'tier': instance.selected_tier,
+        'status': status,
+        'can_upgrade_tier': instance.can_upgrade_tier(),
+        'can_complete': not instance.is_completed and status['percentage'] >= 50,
+    }
+
+
+def day_range(start_day, days=1):
+    """Half-open [start, end) datetime bounds covering `days` whole days.
+
+    Comparing the raw column against these bounds keeps the filter sargable,
+    unlike wrapping the column in db.func.date().
+    """
+    start = datetime.combine(start_day, dt.time.min)
+    return start, start + timedelta(days=days)
+
+
+def todays_instances(user_id, today, completed):
+    """The user's instances created today, either still open or completed"""
+    today_start, today_end = day_range(today)
+    done = TaskInstance.completed_at.is_not(None) if completed else TaskInstance.completed_at.is_(None)
+    return TaskInstance.query.options(*DASHBOARD_INSTANCE_LOADING).filter(
+        TaskInstance.user_id == user_id,
+        TaskInstance.created_at >= today_start,
+        TaskInstance.created_at < today_end,
+        done
     ).all()
 
-    # Category stats
-    category_stats = {}
-    for cat in CATEGORIES:
-        count = sum(1 for t in weekly_completions if t.template.category == cat)
-        category_stats[cat] = count
+
+@bp.route('/')
+def dashboard():
+    """Main dashboard view.
+
+    Active tasks are rendered on every hit; the panels that only change on
+    completion come from the fragment cache (see app/fragments.py), so
+    their queries only run on a miss.
+    """
+    user = current_progress()
+    fragments = fragment_cache()
+    today = date.today()
+    week_start = today - timedelta(days=today.weekday())
+
+    @functools.cache
+    def weekly_counts():
+        # Weekly stats from the daily rollup, shared by two fragments
+        return category_completion_counts(user.id, week_start, today)
+
+    def render_categories():
+        category_stats = {cat: weekly_counts().get(cat, 0) for cat in CATEGORIES}
+        return render_template('_dashboard_categories.html',
+                               category_stats=category_stats,
+                               max_category_count=max(category_stats.values(), default=0),
+                               categories=CATEGORIES)
+
+    progress_panel = fragments.render(
+        'progress', (user.id, user.tasks_completed, week_start),
+        lambda: render_template('_dashboard_progress.html', user=user,
+                                weekly_completions=sum(weekly_counts().values())))
+    category_panel = fragments.render('categories', (user.id, user.tasks_completed, week_start),
+                                      render_categories)
+    completed_panel = fragments.render(
+        'completed', (user.id, user.tasks_completed, user.catalog_version, today),
+        lambda: render_template('_dashboard_completed.html',
+                                completed_tasks=todays_instances(user.id, today, completed=True)))
 
     return render_template('dashboard.html',
-                         user=user,
-                         active_tasks=active_tasks,
-                         completed_tasks=completed_tasks,
-                         weekly_completions=len(weekly_completions),
-                         category_stats=category_stats,
-                         categories=CATEGORIES)
+                           user=user,
+                           active_tasks=todays_instances(user.id, today, completed=False),
+                           progress_panel=progress_panel,
+                           category_panel=category_panel,
+                           completed_panel=completed_panel)
+
 
+@bp.route('/heatmap.svg')
+def heatmap():
+    """Year of daily completions as an SVG heatmap"""
+    user = current_progress()
+    svg = year_heatmap(user.id, date.today(), user.tasks_completed)
+    return Response(svg, mimetype='image/svg+xml')
 
-@app.route('/templates')
+
+@bp.route('/templates')
+@conditional(templates_stamp)
 def templates_list():
     """View all task templates"""
     category_filter = request.args.get('category')
 
-    query = TaskTemplate.query.filter_by(is_active=True)
-    if category_filter:
-        query = query.filter_by(category=category_filter)
-    
-    templates = query.all()
+    user = current_progress()
+    templates = catalog.templates(user.id, user.catalog_version, category=category_filter)
 
     return render_template('templates.html',
                            templates=templates,
@@ -69,12 +192,13 @@ def templates_list():
                            selected_category=category_filter)
 
 
-@app.route('/template/create', methods=['GET', 'POST'])
+@bp.route('/template/create', methods=['GET', 'POST'])
 def create_template():
     """Create a new task template"""
     if request.method == 'POST':
         # Create template
         template = TaskTemplate(
+            user_id=current_user_id(),
             title=request.form.get('title'),
             category=request.form.get('category'),
             task_type=request.form.get('task_type'),
@@ -87,6 +211,7 @@ def create_template():
         
         db.session.add(template)
         db.session.flush()  # Get template.id
+        UserProgress.bump_catalog_version(template.user_id)
 
         # Add subtasks
         subtask_descriptions = request.form.getlist('subtask_description[]')
@@ -102,14 +227,15 @@ def create_template():
                 )
                 db.session.add(subtask)
         db.session.commit()
-        return redirect(url_for('templates_list'))
+        library_changed(template.user_id)
+        return redirect(url_for('main.templates_list'))
     return render_template('create_template.html', categories=CATEGORIES)
 
 
-@app.route('/template/<int:template_id>/edit', methods=['GET', 'POST'])
+@bp.route('/template/<int:template_id>/edit', methods=['GET', 'POST'])
 def edit_template(template_id):
     """Edit an existing template"""
-    template = TaskTemplate.query.get_or_404(template_id)
+    template = owned_template_or_404(template_id)
 
     if request.method == 'POST':
         template.title = request.form.get('title')
@@ -121,136 +247,185 @@ def edit_template(template_id):
         template.base_xp_medium = int(request.form.get('base_xp_medium', 20))
         template.base_xp_high = int(request.form.get('base_xp_high', 30))
 
-        # Delete existing subtasks and recreate
-        SubTask.query.filter_by(template_id=template.id).delete()
+        # Diff the submitted subtasks against the stored ones; ids come from
+        # hidden fields, so existing rows (and checklists using them) survive
+        descriptions = request.form.getlist('subtask_description[]')
+        levels = request.form.getlist('subtask_level[]')
+        ids = request.form.getlist('subtask_id[]')
+        ids += [''] * (len(descriptions) - len(ids))
+
+        submitted = [
+            (int(subtask_id) if subtask_id.isdigit() else None, desc.strip(), int(level))
+            for subtask_id, desc, level in zip(ids, descriptions, levels)
+            if desc.strip()
+        ]
+        template.sync_subtasks(submitted)
+        UserProgress.bump_catalog_version(template.user_id)
 
-        subtask_descriptions = request.form.getlist('subtask_descriptions[]')
-        subtask_levels = request.form.getlist('subtask_level[]')
-
-        for i, (desc, level) in enumerate(zip(subtask_descriptions, subtask_levels)):
-            if desc.strip():
-                subtask = SubTask(
-                    template_id=template.id,
-                    description=desc.strip(),
-                    level=int(level),
-                    order=i
-                )
-                db.session.add(subtask)
-        
         db.session.commit()
-        return redirect(url_for('templates_list'))
+        library_changed(template.user_id)
+        return redirect(url_for('main.templates_list'))
     
     return render_template('edit_template.html', template=template, categories=CATEGORIES)
 
 
-@app.route('/template/<int:template_id>/add', methods=['POST'])
+@bp.route('/template/<int:template_id>/add', methods=['POST'])
 def add_task_from_template(template_id):
     """Create task instance from a template"""
-    template = TaskTemplate.query.get_or_404(template_id)
+    template = owned_template_or_404(template_id)
     tier = int(request.form.get('tier', 1))
 
     # Create task instance
     instance = TaskInstance(
+        user_id=template.user_id,
         template=template,
-        selected_tier=tier
+        selected_tier=tier,
+        completed_count=0,
+        available_count=0
     )
     db.session.add(instance)
     db.session.flush()
 
     # Create subtask completions for available subtasks
-    available_subtasks = template.get_subtasks_for_tier(tier)
-    for subtask in available_subtasks:
-        completion = SubTaskCompletion(
-            task_instance=instance,
-            subtask=subtask,
-            completed=False
-        )
-        db.session.add(completion)
+    SubTaskCompletion.add_for_tier(instance.id, template.id, tier)
     
     db.session.commit()
 
     tier_names = {1: '🌙 Low', 2: '⚡ Medium', 3: '🔥 High'}
     flash(f'Added {template.title} to your tasks ({tier_names[tier]} Energy)!', 'success')
     
-    return redirect(url_for('task_detail', instance_id=instance.id))
+    return redirect(url_for('main.task_detail', instance_id=instance.id))
+
+
+@bp.route('/quests')
+def quest_select():
+    """Filter templates by mood and plan several quests at once"""
+    return render_template('quest_select.html')
+
+
+@bp.route('/api/plan', methods=['POST'])
+def plan_day():
+    """Create many task instances in one transaction.
+
+    Expects {"quests": [{"template_id": 1, "tier": 2}, ...]}.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('quests'), list):
+        return jsonify({'error': 'Expected {"quests": [...]}'}), 400
+    quests = []
+    for quest in data['quests']:
+        try:
+            template_id, tier = int(quest['template_id']), int(quest.get('tier', 1))
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': f'Invalid quest: {quest}'}), 400
+        if tier not in (1, 2, 3):
+            return jsonify({'error': f'Invalid tier: {tier}'}), 400
+        quests.append((template_id, tier))
+
+    if not quests:
+        return jsonify({'error': 'No quests given'}), 400
+    if len(quests) > MAX_PLAN_SIZE:
+        return jsonify({'error': f'At most {MAX_PLAN_SIZE} quests per plan'}), 400
+
+    try:
+        instances = TaskInstance.create_batch(quests, current_user_id())
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 404
+
+    db.session.commit()
+    return jsonify({'instances': instances, 'count': len(instances)}), 201
 
 
-@app.route('/task/<int:instance_id>')
+@bp.route('/task/<int:instance_id>')
+@conditional(instance_stamp)
 def task_detail(instance_id):
     """View task instance with subtasks"""
-    instance = TaskInstance.query.get_or_404(instance_id)
+    instance = owned_instance_or_404(instance_id, *TASK_DETAIL_LOADING)
     return render_template('task_detail.html', instance=instance)
 
 
-@app.route('/task/<int:instance_id>/toggle-subtask/<int:completion_id>', methods=['POST'])
+@bp.route('/task/<int:instance_id>/toggle-subtask/<int:completion_id>', methods=['POST'])
 def toggle_subtask(instance_id, completion_id):
     """Toggle a subtask completion"""
-    instance = TaskInstance.query.get_or_404(instance_id)
+    instance = owned_instance_or_404(instance_id)
     completion = SubTaskCompletion.query.get_or_404(completion_id)
 
     if completion.task_instance_id != instance.id:
         flash('Invalid subtask', 'error')
-        return redirect(url_for('task_detail', instance_id=instance_id))
-    
+        return redirect(url_for('main.task_detail', instance_id=instance_id))
+    if instance.is_completed:
+        flash('This quest is already completed', 'error')
+        return redirect(url_for('main.task_detail', instance_id=instance_id))
+
     completion.toggle()
     db.session.commit()
+    publish(current_user_id(), 'subtask',
+            lambda: dict(instance_state(instance), completion_id=completion.id, completed=completion.completed))
 
     # No flash message for checkbox toggle - too noisy
-    return redirect(url_for('task_detail', instance_id=instance_id))
+    return redirect(url_for('main.task_detail', instance_id=instance_id))
+
+
+@bp.route('/api/task/<int:instance_id>/toggle-subtask/<int:completion_id>', methods=['POST'])
+def toggle_subtask_api(instance_id, completion_id):
+    """Toggle a subtask completion and return the updated progress as JSON"""
+    result = SubTaskCompletion.toggle_by_id(instance_id, completion_id, current_user_id())
+    if result is None:
+        if db.session.scalar(db.select(TaskInstance.completed_at).where(
+                TaskInstance.id == instance_id, TaskInstance.user_id == current_user_id())) is not None:
+            return jsonify({'error': 'Quest already completed'}), 409
+        return jsonify({'error': 'Invalid subtask'}), 404
+
+    db.session.commit()
+    publish(current_user_id(), 'subtask', lambda: dict(result, instance_id=instance_id))
+    return jsonify(result)
 
 
-@app.route('/task/<int:instance_id>/upgrade-tier', methods=['POST'])
+@bp.route('/task/<int:instance_id>/upgrade-tier', methods=['POST'])
 def upgrade_tier(instance_id):
     """Upgrade task to next tier if all current subtasks complete"""
-    instance = TaskInstance.query.get_or_404(instance_id)
+    instance = owned_instance_or_404(instance_id)
 
     if not instance.can_upgrade_tier():
         flash('Complete all subtasks before upgrading!', 'error')
-        return redirect(url_for('task_detail', instance_id=instance_id))
+        return redirect(url_for('main.task_detail', instance_id=instance_id))
     
     if instance.selected_tier >=3:
         flash('Already at maximum tier!', 'error')
-        return redirect(url_for('task_detail', instance_id=instance_id))
+        return redirect(url_for('main.task_detail', instance_id=instance_id))
     
     # Upgrade tier
     old_tier = instance.selected_tier
     instance.selected_tier += 1
+    instance.version = TaskInstance.version + 1
 
     # Add new subtasks for this tier
-    available_subtasks = instance.template.get_subtasks_for_tier(instance.selected_tier)
-    existing_subtask_ids = [sc.subtask.id for sc in instance.subtask_completions]
-
-    for subtask in available_subtasks:
-        if subtask.id not in existing_subtask_ids:
-            completion = SubTaskCompletion(
-                task_instance_id=instance.id,
-                subtask_id=subtask.id,
-                completed=False
-            )
-            db.session.add(completion)
+    SubTaskCompletion.add_for_tier(instance.id, instance.template_id, instance.selected_tier)
     
     db.session.commit()
+    publish(current_user_id(), 'tier', lambda: instance_state(instance))
 
     tier_names = {1: '🌙 Low', 2: '⚡ Medium', 3: '🔥 High'}
     flash(f'Upgraded to {tier_names[instance.selected_tier]} Energy! Keep going!', 'success')
     
-    return redirect(url_for('task_detail', instance_id=instance_id))
+    return redirect(url_for('main.task_detail', instance_id=instance_id))
 
 
-@app.route('/task/<int:instance_id>/complete', methods=['POST'])
+@bp.route('/task/<int:instance_id>/complete', methods=['POST'])
 def complete_task(instance_id):
     """Mark task as complete and award XP"""
-    instance = TaskInstance.query.get_or_404(instance_id)
+    instance = owned_instance_or_404(instance_id)
 
     if instance.is_completed:
         flash('Task already completed!', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     # Check if at least 50% of subtasks are done
     status = instance.get_completion_status()
     if status['percentage'] < 50:
         flash(f'Complete at least 50% of subtasks ({status["completed"]}/{status["total"]})', 'error')
-        return redirect(url_for('task_detail', instance_id=instance_id))
+        return redirect(url_for('main.task_detail', instance_id=instance_id))
     
     # Calculate XP
     xp_earned = instance.template.calculate_xp(
@@ -258,58 +433,66 @@ def complete_task(instance_id):
         status['completed']
     )
 
-    instance.completed_at = dt.datetime.now(dt.timezone.utc)
-    instance.xp_earned = xp_earned
-
-    # Update user progress
-    user = get_or_create_user()
-    user.total_xp += xp_earned
-    user.tasks_completed += 1
-
-    # Update level
-    new_level = user.calculate_level()
-    leveled_up = new_level > user.current_level
-    user.current_level = new_level
-
-    # Update streak
-    today = date.today()
-    if user.last_completion_date:
-        days_diff = (today - user.last_completion_date).days
-        if days_diff == 0:
-            pass  # Same day, no streak change
-        elif days_diff == 1:
-            user.current_streak += 1
-            if user.current_streak > user.longest_streak:
-                user.longest_streak = user.current_streak
-        else:
-            user.current_streak = 1
-    else:
-        user.current_streak = 1
-        user.longest_streak = 1
-
-    user.last_completion_date = today
-
+    # Claim the completion atomically so a second tab cannot award it twice
+    completed_at = dt.datetime.now(dt.timezone.utc)
+    if not TaskInstance.claim_completion(instance.id, xp_earned, completed_at):
+        db.session.rollback()
+        flash('Task already completed!', 'error')
+        return redirect(url_for('main.dashboard'))
+
+    # Update user progress (XP, level and streak in one UPDATE)
+    user_id = instance.user_id
+    progress = UserProgress.record_completion(user_id, xp_earned, date.today())
+
+    # Roll the completion into the user's per-day stats
+    DailyStat.record(user_id, completed_at.date(), instance.template.category, xp_earned,
+                     instance.selected_tier)
+
+    # Queue the day for external graph sync; delivered by the outbox worker
+    if outbox.outbox_enabled(current_app) and user_id == outbox.sync_user_id(current_app):
+        db.session.add(GraphOutbox(day=completed_at.date()))
+
+    completed = {
+        'instance_id': instance.id,
+        'title': instance.template.title,
+        'category': instance.template.category,
+        'tier': instance.selected_tier,
+        'xp_earned': xp_earned,
+        'status': status,
+    }
     db.session.commit()
+    user = remember_progress(user_id, progress)
+    publish(user_id, 'task_completed', lambda: completed)
+    publish(user_id, 'progress', lambda: {
+        'total_xp': user.total_xp,
+        'current_level': user.current_level,
+        'leveled_up': progress['leveled_up'],
+        'xp_for_next_level': user.xp_for_next_level(),
+        'xp_progress_percent': user.xp_progress_percent(),
+        'tasks_completed': user.tasks_completed,
+        'current_streak': user.current_streak,
+        'longest_streak': user.longest_streak,
+    })
 
     tier_emoji = {1: '🌙', 2: '⚡', 3: '🔥'}
     message = f'Quest completed! {tier_emoji[instance.selected_tier]} +{xp_earned} XP'
     
-    if leveled_up:
-        message += f' 🎉 LEVEL UP! Now level {user.current_level}!'
+    if progress['leveled_up']:
+        message += f' 🎉 LEVEL UP! Now level {progress["current_level"]}!'
     
-    flash('message', 'success')
+    flash(message, 'success')
 
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('main.dashboard'))
 
 
-@app.route('/task/<int:instance_id>/delete', methods=['POST'])
+@bp.route('/task/<int:instance_id>/delete', methods=['POST'])
 def delete_task_instance(instance_id):
     """Delete a task instance"""
-    instance = TaskInstance.query.get_or_404(instance_id)
+    instance = owned_instance_or_404(instance_id)
 
     if instance.is_completed:
         flash('Cannot delete completed task!', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     
     task_title = instance.template.title
     
@@ -318,24 +501,91 @@ def delete_task_instance(instance_id):
 
     flash(f'Removed {task_title} from your tasks', 'success')
     
-    return redirect(url_for('dashboard'))
+    return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/api/outbox/metrics')
+def outbox_metrics():
+    """Graph outbox queue depth plus this process's worker stats"""
+    return jsonify({
+        'enabled': outbox.outbox_enabled(current_app),
+        'queue': outbox.queue_metrics(),
+        'worker': outbox.worker.metrics() if outbox.worker else None
+    })
+
+
+@bp.route('/api/events')
+def events():
+    """Server-Sent Events stream of the current user's live updates.
+
+    Refused with 503 once this process holds EVENTS_MAX_STREAMS streams;
+    EventSource does not retry a failed connection, so pages simply stay
+    static.
+    """
+    subscription = event_bus.subscribe(current_user_id(), current_app.config.get('EVENTS_MAX_STREAMS'))
+    if subscription is None:
+        return jsonify({'error': 'Too many open event streams'}), 503
+
+    response = Response(
+        event_stream(subscription, current_app.config.get('EVENTS_HEARTBEAT_SECONDS', 15.0)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # Also covers a response that is never iterated
+    response.call_on_close(lambda: event_bus.unsubscribe(subscription))
+    return response
+
+
+@bp.route('/api/cache/metrics')
+def cache_metrics():
+    """Hit rates of this process's caches; fragments also report render time spent and saved"""
+    return jsonify({
+        'fragments': fragment_cache().stats(),
+        'catalog': catalog.stats(),
+        'progress': progress_cache.stats(),
+    })
 
 
-@app.route('/api/templates/filter', methods=['POST'])
+@bp.route('/api/events/metrics')
+def events_metrics():
+    """Open live-update streams and event counts in this process"""
+    return jsonify(event_bus.stats())
+
+
+@bp.route('/api/templates/filter', methods=['GET', 'POST'])
+@conditional(library_stamp)
 def filter_templates():
-    """API endpoint to filter templates"""
-    data = request.get_json()
-    
-    query = TaskTemplate.query.filter_by(is_active=True)
-    
-    if data.get('category'):
-        query = query.filter_by(category=data['category'])
-    if data.get('effort_type'):
-        query = query.filter_by(effort_type=data['effort_type'])
-    if data.get('location_type'):
-        query = query.filter_by(location_type=data['location_type'])
-    
-    templates = query.all()
+    """API endpoint to filter templates.
+
+    Accepts category/effort_type/location_type filters plus keyset paging
+    (`after`: last id seen, `limit`), as query parameters or a JSON body.
+    Returns one page of templates, the id to request the next page with,
+    the total match count and facet counts. GETs carry an ETag, so a
+    repeated query answers 304 until the library changes.
+    """
+    if request.method == 'GET':
+        data = request.args
+    else:
+        data = request.get_json(silent=True) or {}
+    filters = {facet: data[facet] for facet in TEMPLATE_FACETS if data.get(facet)}
+
+    try:
+        after = int(data['after']) if data.get('after') is not None else None
+        limit = min(max(int(data.get('limit', FILTER_PAGE_SIZE)), 1), MAX_FILTER_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid paging parameters'}), 400
+
+    user_id = current_user_id()
+    templates, next_after = filter_templates_page(user_id, filters, after=after, limit=limit)
+    facets = template_facet_counts(user_id, filters)
+
+    # Category counts exclude only the category filter, so narrowing them to
+    # the selected category (if any) gives the total number of matches
+    category_counts = facets['category']
+    if 'category' in filters:
+        total = category_counts.get(filters['category'], 0)
+    else:
+        total = sum(category_counts.values())
     
     return jsonify({
         'templates': [{
@@ -345,7 +595,49 @@ def filter_templates():
             'task_type': t.task_type,
             'effort_type': t.effort_type,
             'location_type': t.location_type,
-            'subtask_count': len(t.subtasks)
-        } for t in templates]
+            'subtask_count': t.subtask_count
+        } for t in templates],
+        'next_after': next_after,
+        'total': total,
+        'facets': {facet: {value: count for value, count in counts.items() if value is not None}
+                   for facet, counts in facets.items()}
     })
 
+
+@bp.route('/api/templates/export')
+def export_templates():
+    """Stream the user's template library as JSONL (default) or CSV (?format=csv)"""
+    fmt = request.args.get('format', 'jsonl')
+    if fmt not in library.FORMATS:
+        return jsonify({'error': f'Unknown format: {fmt}'}), 400
+    mimetype = 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+    return Response(
+        stream_with_context(library.export_templates(fmt, current_user_id())),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=templates.{fmt}'}
+    )
+
+
+@bp.route('/api/templates/import', methods=['POST'])
+def import_templates():
+    """Upsert templates from a JSONL or CSV request body, read as a stream.
+
+    The format comes from ?format= or the Content-Type (text/csv for CSV).
+    Templates are matched on title + category, so re-sending the same body
+    changes nothing.
+    """
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'jsonl')
+    if fmt not in library.FORMATS:
+        return jsonify({'error': f'Unknown format: {fmt}'}), 400
+
+    user_id = current_user_id()
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    try:
+        stats = library.import_templates(library.parse_templates(lines, fmt), user_id)
+    except library.LibraryFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    db.session.commit()
+    library_changed(user_id)
+    return jsonify(stats)
@@ -16,7 +16,206 @@ function showNotification(message, type = 'success') {
     }, 3000);
 }
 
+// Escape text before interpolating it into innerHTML
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+// Apply a JSON toggle response to the task detail page in place
+function updateTaskProgress(data) {
+    const status = data.status;
+
+    const count = document.getElementById('progress-count');
+    if (count) count.textContent = `${status.completed} / ${status.total}`;
+
+    const bar = document.getElementById('progress-bar-fill');
+    if (bar) bar.style.width = `${status.percentage}%`;
+
+    document.querySelectorAll('.js-status-completed').forEach(el => el.textContent = status.completed);
+    document.querySelectorAll('.js-status-total').forEach(el => el.textContent = status.total);
+
+    const upgrade = document.getElementById('upgrade-section');
+    if (upgrade) upgrade.hidden = !data.can_upgrade_tier;
+
+    const completeForm = document.getElementById('complete-form');
+    const completeDisabled = document.getElementById('complete-disabled');
+    if (completeForm && completeDisabled) {
+        completeForm.hidden = !data.can_complete;
+        completeDisabled.hidden = data.can_complete;
+    }
+}
+
+// Toggle subtasks with fetch; fall back to the regular form post on failure
+function initSubtaskToggles() {
+    document.querySelectorAll('.subtask-form[data-toggle-url]').forEach(form => {
+        const checkbox = form.querySelector('input[type="checkbox"]');
+        const item = form.querySelector('.subtask-item');
+        if (!checkbox) return;
+
+        checkbox.addEventListener('change', function() {
+            checkbox.disabled = true;
+
+            fetch(form.dataset.toggleUrl, {
+                method: 'POST',
+                headers: { 'Accept': 'application/json' }
+            })
+            .then(response => {
+                if (!response.ok) throw new Error(`Toggle failed: ${response.status}`);
+                return response.json();
+            })
+            .then(data => {
+                checkbox.checked = data.completed;
+                if (item) item.classList.toggle('completed', data.completed);
+                updateTaskProgress(data);
+                checkbox.disabled = false;
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                checkbox.disabled = false;
+                form.submit();
+            });
+        });
+    });
+}
+
+const TIER_LABELS = {1: '🌙 Low', 2: '⚡ Medium', 3: '🔥 High'};
+
+// Dashboard: move a completed quest from the active list to today's completions
+function showTaskCompleted(data) {
+    const card = document.querySelector(`.task-instance-card[data-instance-id="${data.instance_id}"]`);
+    if (!card) return;  // already handled (e.g. this tab completed it)
+    card.remove();
+    const active = document.getElementById('active-tasks');
+    if (active && !active.querySelector('.task-instance-card')) active.hidden = true;
+
+    const completed = document.getElementById('completed-tasks');
+    if (completed) {
+        const tierClass = {1: 'low', 2: 'medium', 3: 'high'}[data.tier];
+        completed.querySelector('.completions-list').insertAdjacentHTML('beforeend', `
+            <div class="completion-item">
+                <span class="completion-check">✓</span>
+                <div class="completion-info">
+                    <span class="completion-title">${escapeHtml(data.title)}</span>
+                    <span class="completion-category">${escapeHtml(data.category)}</span>
+                    <span class="completion-subtasks">${data.status.completed}/${data.status.total} subtasks</span>
+                </div>
+                <div class="completion-meta">
+                    <span class="tier-badge ${tierClass}">${TIER_LABELS[data.tier]}</span>
+                    <span class="completion-points">+${data.xp_earned} XP</span>
+                </div>
+            </div>`);
+        completed.hidden = false;
+    }
+
+    const weekly = document.getElementById('weekly-completions');
+    if (weekly) weekly.textContent = Number(weekly.textContent) + 1;
+
+    const categoryCard = document.querySelector(`.category-card[data-category="${CSS.escape(data.category)}"]`);
+    if (categoryCard) {
+        const count = categoryCard.querySelector('.category-count');
+        count.textContent = Number(count.textContent) + 1;
+        // Bars are relative to the busiest category
+        const cards = [...document.querySelectorAll('.category-card')];
+        const counts = cards.map(c => Number(c.querySelector('.category-count').textContent));
+        const peak = Math.max(...counts);
+        cards.forEach((c, i) => {
+            c.querySelector('.category-bar-fill').style.width = `${peak ? counts[i] / peak * 100 : 0}%`;
+        });
+    }
+}
+
+// Dashboard: XP, level and streaks
+function showProgress(data) {
+    const values = Object.assign({}, data, {
+        level_xp: data.total_xp % 100,
+        next_level: data.current_level + 1,
+    });
+    document.querySelectorAll('[data-progress]').forEach(el => {
+        const value = values[el.dataset.progress];
+        if (value !== undefined) el.textContent = value;
+    });
+
+    const bar = document.getElementById('xp-bar-fill');
+    if (bar) bar.style.width = `${data.xp_progress_percent}%`;
+
+    const heatmap = document.getElementById('heatmap');
+    if (heatmap) {
+        const url = new URL(heatmap.src, window.location.href);
+        url.searchParams.set('v', data.tasks_completed);
+        heatmap.src = url.toString();
+    }
+
+    if (data.leveled_up) showNotification(`🎉 LEVEL UP! Now level ${data.current_level}!`);
+}
+
+// Dashboard: progress and tier of an active quest card
+function showCardProgress(data) {
+    const card = document.querySelector(`.task-instance-card[data-instance-id="${data.instance_id}"]`);
+    if (!card) return;
+    card.querySelector('.progress-bar-fill').style.width = `${data.status.percentage}%`;
+    card.querySelectorAll('.js-status-completed').forEach(el => el.textContent = data.status.completed);
+    card.querySelectorAll('.js-status-total').forEach(el => el.textContent = data.status.total);
+
+    const badge = card.querySelector('.instance-tier-badge');
+    if (badge && data.tier) {
+        badge.className = `instance-tier-badge tier-${data.tier}`;
+        badge.textContent = TIER_LABELS[data.tier];
+    }
+}
+
+// Task detail: apply changes made to this quest in another tab
+function showSubtaskChange(data) {
+    const checkbox = document.querySelector(`input[data-completion-id="${data.completion_id}"]`);
+    if (checkbox && !checkbox.disabled) {
+        checkbox.checked = data.completed;
+        const item = checkbox.closest('.subtask-item');
+        if (item) item.classList.toggle('completed', data.completed);
+    }
+    updateTaskProgress(data);
+}
+
+// Subscribe to /api/events and patch the page as quests change elsewhere
+function initLiveUpdates() {
+    const root = document.querySelector('[data-events-url]');
+    if (!root || !window.EventSource) return;
+
+    const instanceId = root.dataset.instanceId ? Number(root.dataset.instanceId) : null;
+    const source = new EventSource(root.dataset.eventsUrl);
+    let interrupted = false;
+    let leaving = false;
+    // Our own form posts publish events too; never reload over their navigation
+    const reload = () => { if (!leaving) window.location.reload(); };
+
+    const on = (name, handler) => source.addEventListener(name, event => handler(JSON.parse(event.data)));
+
+    if (instanceId === null) {
+        on('subtask', showCardProgress);
+        on('tier', showCardProgress);
+        on('task_completed', showTaskCompleted);
+        on('progress', showProgress);
+    } else {
+        on('subtask', data => { if (data.instance_id === instanceId) showSubtaskChange(data); });
+        // New checklist rows or the completed state need a fresh render
+        on('tier', data => { if (data.instance_id === instanceId) reload(); });
+        on('task_completed', data => { if (data.instance_id === instanceId) reload(); });
+    }
+
+    // Events sent while disconnected are lost, so resync after a reconnect
+    source.addEventListener('error', () => { interrupted = true; });
+    source.addEventListener('open', () => {
+        if (interrupted) reload();
+    });
+    window.addEventListener('beforeunload', () => {
+        leaving = true;
+        source.close();
+    });
+}
+
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
+    initSubtaskToggles();
+    initLiveUpdates();
     console.log('Conquer initialized! 🗡️');
 });
\ No newline at end of file
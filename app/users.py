@@ -0,0 +1,164 @@
+"""Which user the current request belongs to, and their progress.
+
+Conquer does not authenticate users itself. A deployment hosting several
+users puts it behind a proxy that does, and names the header carrying the
+user's id in USER_ID_HEADER; the proxy must overwrite that header on every
+request, and requests without it are refused. Without the setting, every
+request belongs to DEFAULT_USER_ID, which is how single-user installs keep
+working unchanged.
+
+Users exist once provisioned (init-db creates the default user, the
+create-user command any other); requests for unknown users get a 403.
+Their progress is read through a per-process cache (see ProgressCache), so
+most requests resolve the user without touching the database.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from flask import abort, current_app, g, request, session
+
+from app import db
+from app.models import DEFAULT_USER_ID, UserProgress
+
+PROGRESS_FIELDS = ('total_xp', 'current_level', 'tasks_completed', 'current_streak', 'longest_streak',
+                   'last_completion_date', 'catalog_version')
+
+# Session key holding the tasks_completed this browser last wrote; a cached
+# entry older than that is reloaded, so a completion handled by one worker
+# process shows up on the next page even if another process serves it
+_SEEN_KEY = 'progress_seen'
+
+
+@dataclass(frozen=True)
+class Progress:
+    """Read-only copy of a UserProgress row.
+
+    Exposes the same attributes and helpers the templates read from
+    UserProgress, so it can be rendered in place of the ORM object.
+    """
+    id: int
+    total_xp: int
+    current_level: int
+    tasks_completed: int
+    current_streak: int
+    longest_streak: int
+    last_completion_date: Optional[date]
+    catalog_version: int
+
+    def xp_for_next_level(self):
+        return self.current_level * 100 - self.total_xp
+
+    def xp_progress_percent(self):
+        return ((self.total_xp % 100) / 100) * 100
+
+
+class ProgressCache:
+    """Per-process cache of Progress snapshots, keyed by user id.
+
+    Entries are loaded by primary key and served for up to `max_age`
+    seconds; complete_task writes the values its UPDATE returned straight
+    back (put), so the process that handled a completion never serves the
+    old numbers. Other processes catch up when the entry expires, or
+    sooner for the browser that made the change (see _SEEN_KEY). The
+    `max_users` most recently read users are kept.
+    """
+
+    def __init__(self, max_users=10_000):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user id -> (loaded at, Progress)
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, max_age, min_tasks_completed=0):
+        """The user's progress, or None if the user does not exist"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if (cached is not None and now - cached[0] < max_age
+                    and cached[1].tasks_completed >= min_tasks_completed):
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        row = db.session.execute(
+            db.select(*(getattr(UserProgress, f) for f in PROGRESS_FIELDS)).where(UserProgress.id == user_id)
+        ).one_or_none()
+        if row is None:
+            return None
+        progress = Progress(user_id, *row)
+        self.put(progress, loaded_at=now)
+        return progress
+
+    def put(self, progress, loaded_at=None):
+        """Store a snapshot, e.g. the values a committed UPDATE returned"""
+        with self._lock:
+            self._entries[progress.id] = (time.monotonic() if loaded_at is None else loaded_at, progress)
+            self._entries.move_to_end(progress.id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """Forget one user's snapshot, or everyone's"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'users': len(self._entries),
+        }
+
+
+progress_cache = ProgressCache()
+
+
+def current_user_id():
+    """Id of the user this request acts for, resolved once per request"""
+    return current_progress().id
+
+
+def current_progress():
+    """The current user's Progress, looked up at most once per request"""
+    if 'progress' not in g:
+        user_id = _resolve_user_id()
+        progress = progress_cache.get(user_id, current_app.config.get('PROGRESS_CACHE_SECONDS', 5.0),
+                                      session.get(_SEEN_KEY, 0))
+        if progress is None:
+            abort(403, f'Unknown user {user_id}')
+        g.progress = progress
+    return g.progress
+
+
+def remember_progress(user_id, values):
+    """Write committed progress values (see UserProgress.record_completion) through to the caches"""
+    progress = Progress(user_id, *(values[f] for f in PROGRESS_FIELDS))
+    progress_cache.put(progress)
+    session[_SEEN_KEY] = progress.tasks_completed
+    g.progress = progress
+    return progress
+
+
+def _resolve_user_id():
+    header = current_app.config.get('USER_ID_HEADER')
+    if not header:
+        return DEFAULT_USER_ID
+    value = request.headers.get(header)
+    if value is None:
+        # Falling back to the default user here would expose its data
+        abort(401, f'Missing {header} header')
+    if not value.isdigit() or int(value) < 1:
+        abort(400, f'Invalid {header} header')
+    return int(value)
@@ -0,0 +1,98 @@
+"""Concurrent task completion stress test.
+
+Completes thousands of task instances from a thread pool (each instance is
+also submitted twice, as if from two tabs) and then checks that the user's
+totals match the completed instances exactly: no lost XP updates and no
+double awards.
+
+    python benchmarks/complete_stress.py [instances] [threads]
+
+Runs against a throwaway SQLite database by default. SQLite serializes
+writers, so set BENCH_DB_URI to an empty Postgres/MySQL database to
+exercise real concurrent read-modify-write races.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ['DB_URI'] = os.environ.get('BENCH_DB_URI', f'sqlite:///{DB_PATH}')
+
+from app import create_app, db  # noqa: E402
+from app.models import DEFAULT_USER_ID, TaskTemplate, TaskInstance, UserProgress  # noqa: E402
+
+app = create_app()
+
+INSTANCES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+THREADS = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+MAX_ATTEMPTS = 20
+
+
+def seed():
+    """One template and INSTANCES ready-to-complete instances"""
+    template = TaskTemplate(title='Stress', category='Work', task_type='daily',
+                            effort_type='mental', location_type='any')
+    db.session.add(template)
+    db.session.flush()
+    now = datetime.now()
+    db.session.execute(TaskInstance.__table__.insert(), [
+        {'template_id': template.id, 'selected_tier': 1 + i % 3, 'created_at': now,
+         'xp_earned': 0, 'completed_count': 2, 'available_count': 3}
+        for i in range(INSTANCES)
+    ])
+    UserProgress.provision(DEFAULT_USER_ID)
+    db.session.commit()
+
+
+def complete(instance_id):
+    """POST the completion, retrying requests that failed on lock contention"""
+    client = app.test_client()
+    for attempt in range(MAX_ATTEMPTS):
+        response = client.post(f'/task/{instance_id}/complete')
+        if response.status_code != 500:
+            return response.status_code, attempt
+        time.sleep(0.01 * (attempt + 1))
+    return 500, attempt
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        db.create_all()
+        seed()
+
+    # Two submissions per instance, interleaved across the pool
+    jobs = [i for i in range(1, INSTANCES + 1)] * 2
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        results = list(pool.map(complete, jobs))
+    elapsed = time.perf_counter() - start
+
+    statuses = Counter(status for status, _ in results)
+    retries = sum(attempt for _, attempt in results)
+
+    with app.app_context():
+        user = UserProgress.query.first()
+        completed = TaskInstance.query.filter(TaskInstance.completed_at.isnot(None)).count()
+        awarded = db.session.scalar(db.select(db.func.sum(TaskInstance.xp_earned)))
+
+        print(f'\n{len(jobs)} completion requests over {THREADS} threads in {elapsed:.2f}s '
+              f'({len(jobs) / elapsed:.0f} req/s, {retries} retries)')
+        print(f'   responses: {dict(statuses)}')
+        print(f'   instances completed: {completed} / {INSTANCES}')
+        print(f'   user: xp={user.total_xp} tasks={user.tasks_completed} level={user.current_level}')
+        print(f'   sum(xp_earned) = {awarded}')
+
+        assert statuses.get(500, 0) == 0, 'Requests failed after retries'
+        assert completed == INSTANCES
+        assert user.tasks_completed == INSTANCES, 'Lost or duplicated task counter updates'
+        assert user.total_xp == awarded, 'Lost or duplicated XP updates'
+        assert user.current_level == user.total_xp // 100 + 1
+    print('\n✅ Totals are exact')
@@ -0,0 +1,168 @@
+"""Dashboard latency with the fragment cache off, in memory and in Redis.
+
+Generates one synthetic history, then replays the same workload against
+each FRAGMENT_CACHE backend: dashboard views, with a subtask toggle every
+--toggle-every views and a task completion every --complete-every views.
+Toggles must leave the cached fragments alone; completions must replace
+them, which the script checks by reading the completed-task counter off the
+next dashboard. Reports dashboard latency, queries per view, the cache hit
+rate and the render time the cache reports as saved.
+
+The redis backend talks to a small in-process RESP stub unless
+--redis-url points at a real server.
+
+    python benchmarks/dashboard_fragments.py [--views 300] [--backends none memory redis]
+                                             [--redis-url redis://localhost:6379/0]
+"""
+
+import argparse
+import os
+import re
+import socketserver
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+from app import db  # noqa: E402
+from app.catalog import catalog  # noqa: E402
+from app.fragments import fragment_cache  # noqa: E402
+from app.models import TaskInstance, SubTaskCompletion, UserProgress, DEFAULT_USER_ID  # noqa: E402
+from app.querycount import count_queries  # noqa: E402
+from app.users import progress_cache  # noqa: E402
+
+TASKS_COMPLETED = re.compile(rb'data-progress="tasks_completed">(\d+)<')
+
+
+class FakeRedis(socketserver.StreamRequestHandler):
+    """Answers GET, SET (ignoring expiry), AUTH and SELECT from a shared dict"""
+    store = {}
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2])
+            command = args[0].upper()
+            if command == b'GET':
+                value = self.store.get(args[1])
+                reply = b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+            elif command == b'SET':
+                self.store[args[1]] = args[2]
+                reply = b'+OK\r\n'
+            else:
+                reply = b'+OK\r\n'
+            self.wfile.write(reply)
+
+
+def start_fake_redis():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), FakeRedis)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'redis://127.0.0.1:{server.server_address[1]}/0'
+
+
+def prepare_work(app, completions):
+    """A toggle target and `completions` open instances ready to complete, all created today"""
+    with app.app_context():
+        open_ids = db.session.scalars(
+            db.select(TaskInstance.id).where(TaskInstance.completed_at.is_(None), TaskInstance.available_count > 0)
+            .order_by(TaskInstance.id.desc()).limit(completions + 1)
+        ).all()
+        if len(open_ids) < completions + 1:
+            raise SystemExit('Not enough open tasks created today')
+        toggle_instance, completable = open_ids[0], open_ids[1:]
+        toggle_completion = db.session.scalar(
+            db.select(SubTaskCompletion.id).where(SubTaskCompletion.task_instance_id == toggle_instance).limit(1)
+        )
+        db.session.execute(db.update(SubTaskCompletion)
+                           .where(SubTaskCompletion.task_instance_id.in_(completable))
+                           .values(completed=True))
+        db.session.execute(db.update(TaskInstance)
+                           .where(TaskInstance.id.in_(completable))
+                           .values(completed_count=TaskInstance.available_count))
+        db.session.commit()
+    return f'/api/task/{toggle_instance}/toggle-subtask/{toggle_completion}', completable
+
+
+def run(app, views, toggle_every, complete_every):
+    """Replay the workload; call outside an app context so every request gets its own session"""
+    with app.app_context():
+        engine = db.engine
+        completed_before = db.session.get(UserProgress, DEFAULT_USER_ID).tasks_completed
+    catalog.invalidate()
+    progress_cache.invalidate()
+    toggle_path, completable = prepare_work(app, views // complete_every)
+    completable = iter(completable)
+    client = app.test_client()
+    client.get('/')  # warm-up: templates compiled, fragments cached
+
+    timings, queries, stale = [], [], 0
+    completions = 0
+    for i in range(1, views + 1):
+        if i % toggle_every == 0:
+            client.post(toggle_path)
+        if i % complete_every == 0:
+            client.post(f'/task/{next(completable)}/complete')
+            completions += 1
+        with count_queries(engine) as counter:
+            start = time.perf_counter()
+            response = client.get('/')
+            elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.status_code
+        shown = int(TASKS_COMPLETED.search(response.data).group(1))
+        stale += shown != completed_before + completions
+        timings.append(elapsed * 1000)
+        queries.append(counter.count)
+
+    with app.app_context():
+        stats = fragment_cache().stats()
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95)],
+        'queries': statistics.fmean(queries),
+        'stale': stale,
+        'completions': completions,
+        **stats,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--views', type=int, default=300)
+    parser.add_argument('--toggle-every', type=int, default=3)
+    parser.add_argument('--complete-every', type=int, default=25)
+    parser.add_argument('--templates', type=int, default=200)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--backends', nargs='+', default=['none', 'memory', 'redis'])
+    parser.add_argument('--redis-url', help='Real Redis-compatible server (default: an in-process stub).')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+    app = datagen.create_database(path)
+    with app.app_context():
+        datagen.generate(templates=args.templates, years=args.years, tasks_per_day=8,
+                         today_tasks=args.views // args.complete_every * len(args.backends) + len(args.backends) + 8)
+
+    redis_url = args.redis_url or (start_fake_redis() if 'redis' in args.backends else None)
+    print(f'{"backend":<8} {"p50 ms":>7} {"p95 ms":>7} {"queries":>8} {"hit rate":>9} '
+          f'{"render ms":>10} {"saved ms":>9} {"errors":>7} {"stale":>6}')
+    for backend in args.backends:
+        bench_app = datagen.create_database(path, FRAGMENT_CACHE=backend, FRAGMENT_CACHE_URL=redis_url)
+        r = run(bench_app, args.views, args.toggle_every, args.complete_every)
+        print(f'{backend:<8} {r["p50"]:>7.2f} {r["p95"]:>7.2f} {r["queries"]:>8.2f} {r["hit_rate"]:>9.1%} '
+              f'{r["render_ms"]:>10.1f} {r["saved_ms"]:>9.1f} {r["errors"]:>7} {r["stale"]:>6}')
+        assert r['stale'] == 0, f'{backend}: {r["stale"]} dashboards showed an outdated completion count'
+    print(f'\n✅ Every dashboard showed the current completion count ({r["completions"]} completions per backend)')
+    print(f'Database left at {path}')
@@ -0,0 +1,123 @@
+"""Dashboard latency as task history grows.
+
+Grows one throwaway SQLite database through increasing amounts of past
+TaskInstance history and times GET / at each size. Today's workload is held
+constant, so with index-friendly range filters the latency should stay flat.
+
+    python benchmarks/dashboard_history.py [1000 10000 100000 1000000]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import random
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ['DB_URI'] = f'sqlite:///{DB_PATH}'
+
+from app import create_app, db  # noqa: E402
+from app.commands import init_db  # noqa: E402
+from app.models import TaskTemplate, SubTask, TaskInstance, CATEGORIES, DEFAULT_USER_ID  # noqa: E402
+
+app = create_app()
+
+SIZES = [int(n) for n in sys.argv[1:]] or [1_000, 10_000, 100_000, 1_000_000]
+REQUESTS_PER_SIZE = 50
+CHUNK = 50_000
+
+
+def seed_templates(count=40):
+    """Create a small template library and a handful of today's instances"""
+    for i in range(count):
+        template = TaskTemplate(
+            title=f'Bench Template {i}',
+            category=CATEGORIES[i % len(CATEGORIES)],
+            task_type='daily',
+            effort_type=('physical', 'mental', 'creative')[i % 3],
+            location_type=('indoor', 'outdoor', 'any')[i % 3]
+        )
+        db.session.add(template)
+        db.session.flush()
+        for order in range(6):
+            db.session.add(SubTask(template_id=template.id, description=f'Step {order}',
+                                   level=order // 2 + 1, order=order))
+
+    now = datetime.now()
+    for i in range(10):
+        db.session.add(TaskInstance(template_id=i + 1, selected_tier=1 + i % 3, created_at=now,
+                                    completed_at=now if i % 2 else None))
+    db.session.commit()
+    return count
+
+
+def grow_history(current, target, template_count):
+    """Bulk insert past instances until the table holds `target` history rows"""
+    rng = random.Random(current)
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    week_start = today - timedelta(days=today.weekday())
+    while current < target:
+        batch = min(CHUNK, target - current)
+        rows = []
+        for _ in range(batch):
+            # Strictly before this week, spread across ~3 years of history
+            created = week_start - timedelta(days=rng.randint(1, 1095), minutes=rng.randint(1, 1439))
+            rows.append({
+                'template_id': rng.randint(1, template_count),
+                'selected_tier': rng.randint(1, 3),
+                'created_at': created,
+                'completed_at': created + timedelta(hours=1) if rng.random() < 0.8 else None,
+                'xp_earned': 20,
+            })
+        db.session.execute(TaskInstance.__table__.insert(), rows)
+        db.session.commit()
+        current += batch
+    return current
+
+
+def time_dashboard(client):
+    samples = []
+    for _ in range(REQUESTS_PER_SIZE):
+        start = time.perf_counter()
+        response = client.get('/')
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def print_query_plans():
+    today_start = datetime.combine(datetime.now().date(), datetime.min.time())
+    plans = {
+        'today': 'SELECT id FROM task_instance WHERE user_id = :u AND created_at >= :s AND created_at < :e',
+        'week': 'SELECT id FROM task_instance WHERE user_id = :u AND completed_at >= :s AND completed_at < :e',
+    }
+    for name, sql in plans.items():
+        rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}'),
+                                  {'u': DEFAULT_USER_ID, 's': today_start,
+                                   'e': today_start + timedelta(days=1)}).all()
+        print(f'   plan[{name}]: ' + '; '.join(row[-1] for row in rows))
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        init_db()
+        template_count = seed_templates()
+        client = app.test_client()
+        client.get('/')  # warm up
+
+        print(f'\nDashboard latency vs history size ({REQUESTS_PER_SIZE} requests each)')
+        print(f'{"history rows":>14} {"p50 ms":>9} {"p95 ms":>9}')
+        rows = 0
+        for size in SIZES:
+            rows = grow_history(rows, size, template_count)
+            p50, p95 = time_dashboard(client)
+            print(f'{rows:>14,} {p50:>9.2f} {p95:>9.2f}')
+
+        print_query_plans()
+    print(f'\nDatabase left at {DB_PATH}')
@@ -0,0 +1,278 @@
+"""Synthetic data at production scale.
+
+Generates N templates with tiered subtasks and years of TaskInstance /
+SubTaskCompletion history with skewed, roughly realistic distributions:
+
+- template popularity is Zipf-like, so a few templates dominate history;
+- tasks per day are Poisson around --tasks-per-day, lighter on weekends;
+- tiers lean low/medium, most tasks get completed, and completed tasks
+  have between half and all of their subtasks checked;
+- a handful of open tasks are created today so the dashboard has work.
+
+With --users N, every user gets their own library and history of that
+shape. The daily rollup and each user's totals and streaks are rebuilt
+from the generated history. Rows are bulk-inserted with explicit ids, so
+generation stays fast at millions of rows.
+
+    python benchmarks/datagen.py [--templates 500] [--years 3] [--tasks-per-day 8]
+                                 [--today 8] [--users 1] [--seed 1] [--db PATH]
+
+Import it to seed another benchmark: `generate(templates=..., years=...)`
+inside an app context returns a summary of what was created. --years may
+be fractional.
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ.setdefault('DB_URI', 'sqlite://')
+
+from app import create_app, db  # noqa: E402
+from app.commands import init_db  # noqa: E402
+from app.models import (TaskTemplate, SubTask, TaskInstance, SubTaskCompletion, DailyStat,  # noqa: E402
+                        UserProgress, CATEGORIES, DEFAULT_USER_ID)
+from config import Config, sqlite_pragmas  # noqa: E402
+
+CATEGORY_WEIGHTS = [5, 3, 4, 3, 2, 2, 2, 4][:len(CATEGORIES)]
+TASK_TYPES = (['daily', 'weekly', 'bonus'], [6, 3, 1])
+EFFORT_TYPES = (['physical', 'mental', 'creative'], [4, 4, 2])
+LOCATION_TYPES = (['indoor', 'outdoor', 'any'], [5, 2, 3])
+TIERS = ([1, 2, 3], [35, 45, 20])
+COMPLETION_RATE = 0.75
+WEEKEND_FACTOR = 0.6
+CHUNK = 10_000
+
+
+def _poisson(rng, mean):
+    # Knuth's method; fine for the small means used here
+    limit, k, p = math.exp(-mean), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(table.insert(), rows[start:start + CHUNK])
+
+
+def _next_id(model):
+    return (db.session.scalar(db.select(db.func.max(model.id))) or 0) + 1
+
+
+def generate(templates=500, subtasks=(3, 12), years=3, tasks_per_day=8.0, today_tasks=8, seed=1,
+             users=1, first_user_id=DEFAULT_USER_ID):
+    """Bulk-insert synthetic templates and history for `users` users; returns row counts.
+
+    Each user gets their own `templates` templates and history, with ids
+    first_user_id, first_user_id + 1, ... (existing users are extended).
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    today = date.today()
+    user_ids = range(first_user_id, first_user_id + users)
+
+    existing = set(db.session.scalars(db.select(UserProgress.id).where(
+        UserProgress.id.between(user_ids[0], user_ids[-1]))))
+    _insert(UserProgress.__table__, [{'id': user_id} for user_id in user_ids if user_id not in existing])
+
+    next_ids = {model: _next_id(model) for model in (TaskTemplate, SubTask, TaskInstance, SubTaskCompletion)}
+    rows = {model: [] for model in next_ids}
+    for user_id in user_ids:
+        _generate_user(rng, user_id, next_ids, rows, now, today, templates, subtasks, years,
+                       tasks_per_day, today_tasks)
+        if len(rows[SubTaskCompletion]) >= CHUNK * 5:
+            _flush(rows)
+    _flush(rows)
+
+    DailyStat.rebuild()
+    _rebuild_progress(user_ids, today)
+    db.session.commit()
+
+    return {
+        'users': db.session.scalar(db.select(db.func.count(UserProgress.id))),
+        'templates': db.session.scalar(db.select(db.func.count(TaskTemplate.id))),
+        'subtasks': db.session.scalar(db.select(db.func.count(SubTask.id))),
+        'task_instances': db.session.scalar(db.select(db.func.count(TaskInstance.id))),
+        'subtask_completions': db.session.scalar(db.select(db.func.count(SubTaskCompletion.id))),
+        'daily_stats': db.session.scalar(db.select(db.func.count()).select_from(DailyStat)),
+    }
+
+
+def _flush(rows):
+    # Parents before children
+    for model, pending in rows.items():
+        _insert(model.__table__, pending)
+        pending.clear()
+
+
+def _generate_user(rng, user_id, next_ids, rows, now, today, templates, subtasks, years,
+                   tasks_per_day, today_tasks):
+    # Templates and subtasks
+    template_rows = []
+    tier_subtasks = {}  # template id -> {tier: [subtask ids]}
+    for n in range(templates):
+        template_id = next_ids[TaskTemplate]
+        low = rng.randint(5, 20)
+        template_rows.append({
+            'id': template_id,
+            'user_id': user_id,
+            'title': f'Synthetic quest {template_id}',
+            'category': rng.choices(CATEGORIES, CATEGORY_WEIGHTS)[0],
+            'task_type': rng.choices(*TASK_TYPES)[0],
+            'effort_type': rng.choices(*EFFORT_TYPES)[0],
+            'location_type': rng.choices(*LOCATION_TYPES)[0],
+            'base_xp_low': low,
+            'base_xp_medium': low * 2,
+            'base_xp_high': low * 3,
+            'is_active': rng.random() < 0.95,
+            'created_at': now - timedelta(days=round(years * 365)),
+        })
+        count = round(rng.triangular(subtasks[0], subtasks[1], (subtasks[0] + subtasks[1]) / 2))
+        levels = sorted(rng.choices([1, 2, 3], [4, 3, 3], k=count))
+        levels[0] = 1  # every template has something to do at low energy
+        by_tier = {1: [], 2: [], 3: []}
+        for order, level in enumerate(levels):
+            subtask_id = next_ids[SubTask]
+            rows[SubTask].append({'id': subtask_id, 'template_id': template_id,
+                                  'description': f'Step {order + 1} of quest {template_id}',
+                                  'level': level, 'order': order})
+            for tier in range(level, 4):
+                by_tier[tier].append(subtask_id)
+            next_ids[SubTask] += 1
+        tier_subtasks[template_id] = (by_tier, template_rows[-1])
+        next_ids[TaskTemplate] += 1
+    rows[TaskTemplate].extend(template_rows)
+
+    # Zipf-like popularity over active templates
+    active = [row['id'] for row in template_rows if row['is_active']] or [row['id'] for row in template_rows]
+    rng.shuffle(active)
+    popularity = [1 / (rank + 1) ** 1.1 for rank in range(len(active))]
+
+    # History, oldest day first, then today's open tasks
+    days = [(today - timedelta(days=offset), None) for offset in range(round(years * 365), 0, -1)]
+    days.append((today, today_tasks))
+    for day, fixed in days:
+        mean = tasks_per_day * (WEEKEND_FACTOR if day.weekday() >= 5 else 1)
+        count = fixed if fixed is not None else _poisson(rng, mean)
+        picks = rng.choices(active, popularity, k=count)
+        for template in picks:
+            by_tier, template_row = tier_subtasks[template]
+            tier = rng.choices(*TIERS)[0]
+            available = by_tier[tier]
+            created_at = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randint(6 * 60, 20 * 60))
+            completed = fixed is None and rng.random() < COMPLETION_RATE
+            if completed:
+                done = max(math.ceil(len(available) / 2), round(len(available) * rng.uniform(0.5, 1.0)))
+            else:
+                done = int(len(available) * rng.uniform(0, 0.5))
+            completed_at = created_at + timedelta(minutes=rng.randint(5, 180)) if completed else None
+            xp = ({1: template_row['base_xp_low'], 2: template_row['base_xp_medium'],
+                   3: template_row['base_xp_high']}[tier] + done * 2) if completed else 0
+            instance_id = next_ids[TaskInstance]
+            rows[TaskInstance].append({
+                'id': instance_id, 'user_id': user_id, 'template_id': template, 'selected_tier': tier,
+                'created_at': created_at, 'completed_at': completed_at, 'xp_earned': xp,
+                'completed_count': done, 'available_count': len(available),
+            })
+            checked = set(rng.sample(available, done))
+            for subtask in available:
+                is_done = subtask in checked
+                rows[SubTaskCompletion].append({
+                    'id': next_ids[SubTaskCompletion], 'task_instance_id': instance_id, 'subtask_id': subtask,
+                    'completed': is_done, 'completed_at': created_at + timedelta(minutes=1) if is_done else None,
+                })
+                next_ids[SubTaskCompletion] += 1
+            next_ids[TaskInstance] += 1
+        if len(rows[SubTaskCompletion]) >= CHUNK * 5:
+            _flush(rows)
+
+
+def _rebuild_progress(user_ids, today):
+    """Set each user's XP, level, task count and streaks from the rollup"""
+    in_range = DailyStat.user_id.between(user_ids[0], user_ids[-1])
+    totals = {row.user_id: row for row in db.session.execute(
+        db.select(DailyStat.user_id, db.func.sum(DailyStat.xp).label('xp'),
+                  db.func.sum(DailyStat.completions).label('completions'))
+        .where(in_range).group_by(DailyStat.user_id)
+    )}
+    days = {}
+    for user_id, day in db.session.execute(
+        db.select(DailyStat.user_id, DailyStat.day).distinct().where(in_range)
+        .order_by(DailyStat.user_id, DailyStat.day)
+    ):
+        days.setdefault(user_id, []).append(day)
+
+    updates = []
+    for user_id in user_ids:
+        longest = run = 0
+        previous = None
+        for day in days.get(user_id, ()):
+            run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+            longest = max(longest, run)
+            previous = day
+        total = totals.get(user_id)
+        total_xp = total.xp if total else 0
+        updates.append({
+            'id': user_id,
+            'total_xp': total_xp,
+            'current_level': total_xp // 100 + 1,
+            'tasks_completed': total.completions if total else 0,
+            'current_streak': run if previous is not None and today - previous <= timedelta(days=1) else 0,
+            'longest_streak': longest,
+            'last_completion_date': previous,
+        })
+    db.session.execute(db.update(UserProgress), updates)
+
+
+def create_database(path, profile='tuned', **settings):
+    """An initialised, empty database file and an app bound to it; `settings` override Config"""
+    uri = f'sqlite:///{path}'
+    config = type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLITE_PRAGMAS': sqlite_pragmas(uri, profile),
+        **settings,
+    })
+    app = create_app(config)
+    with app.app_context():
+        init_db()
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic Conquer data')
+    parser.add_argument('--templates', type=int, default=500)
+    parser.add_argument('--min-subtasks', type=int, default=3)
+    parser.add_argument('--max-subtasks', type=int, default=12)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--tasks-per-day', type=float, default=8.0)
+    parser.add_argument('--today', type=int, default=8, help='Open tasks to create today.')
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--first-user', type=int, default=DEFAULT_USER_ID)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', help='SQLite file to create or extend (default: a temp file).')
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+    app = create_database(path)
+    start = time.perf_counter()
+    with app.app_context():
+        counts = generate(templates=args.templates, subtasks=(args.min_subtasks, args.max_subtasks),
+                          years=args.years, tasks_per_day=args.tasks_per_day,
+                          today_tasks=args.today, seed=args.seed, users=args.users,
+                          first_user_id=args.first_user)
+    print(f'\nGenerated in {time.perf_counter() - start:.1f}s:')
+    for table, count in counts.items():
+        print(f'   {table}: {count:,}')
+    print(f'\nDatabase at {path}')
@@ -0,0 +1,201 @@
+"""Requests per second under gunicorn as the worker count grows.
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app` against a throwaway SQLite
+database once per worker count and engine profile (DB_PROFILE), then drives
+it from keep-alive client threads for a fixed time: GET / (read path), the
+JSON subtask toggle and quest completion (write paths). Other environment
+is passed through to the server.
+
+    python benchmarks/load_test.py [--workers 1 2 4] [--threads 4]
+                                   [--clients 16] [--duration 5]
+                                   [--profiles tuned]
+
+Read throughput should scale with workers up to the number of CPUs; SQLite
+serialises writers, so writes scale less. `--profiles default tuned`
+compares rollback-journal SQLite against WAL plus pragmas.
+"""
+
+import argparse
+import http.client
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_DIR = tempfile.mkdtemp(prefix='conquer-bench-')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ['DB_URI'] = f'sqlite:///{os.path.join(BENCH_DIR, "bench.db")}'
+
+from app import create_app, db  # noqa: E402
+from app.commands import init_db  # noqa: E402
+from app.models import TaskTemplate, SubTask, TaskInstance, SubTaskCompletion  # noqa: E402
+from config import Config, sqlite_pragmas  # noqa: E402
+
+INSTANCES = 50
+# Ready-to-complete tasks, created yesterday so they stay off the dashboard
+COMPLETABLE = 20_000
+
+
+def seed():
+    """Dashboard cards, tasks to toggle and tasks to complete.
+
+    Returns (toggle targets, completable instance ids).
+    """
+    template = TaskTemplate(title='Load', category='Work', task_type='daily',
+                            effort_type='mental', location_type='any')
+    template.subtasks = [SubTask(description=f'Step {i}', level=1 + i % 3, order=i) for i in range(9)]
+    db.session.add(template)
+    db.session.flush()
+
+    now = datetime.now()
+    instances = [TaskInstance(template_id=template.id, selected_tier=3, created_at=now)
+                 for _ in range(INSTANCES)]
+    db.session.add_all(instances)
+    db.session.flush()
+    for instance in instances:
+        SubTaskCompletion.add_for_tier(instance.id, template.id, 3)
+    yesterday = now - timedelta(days=1)
+    db.session.execute(TaskInstance.__table__.insert(), [
+        {'template_id': template.id, 'selected_tier': 1, 'created_at': yesterday,
+         'xp_earned': 0, 'completed_count': 1, 'available_count': 1}
+        for _ in range(COMPLETABLE)
+    ])
+    db.session.commit()
+
+    toggles = db.session.execute(
+        db.select(SubTaskCompletion.task_instance_id, SubTaskCompletion.id)
+    ).all()
+    completable = db.session.scalars(
+        db.select(TaskInstance.id).where(TaskInstance.created_at < now - timedelta(hours=12))
+    ).all()
+    return toggles, completable
+
+
+def prepare_database(profile):
+    """A fresh, seeded database for one profile (WAL mode persists in the file)"""
+    uri = f'sqlite:///{os.path.join(BENCH_DIR, f"{profile}.db")}'
+    config = type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLITE_PRAGMAS': sqlite_pragmas(uri, profile),
+    })
+    with create_app(config).app_context():
+        init_db()
+        targets = seed()
+    return uri, targets
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, threads, port, uri, profile):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), WEB_THREADS=str(threads),
+               BIND=f'127.0.0.1:{port}', OUTBOX_IN_PROCESS='0', DB_URI=uri, DB_PROFILE=profile)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning', 'wsgi:app'],
+        cwd=ROOT, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def drive(port, make_request, clients, duration):
+    """Run `clients` keep-alive threads for `duration` seconds; returns (rps, p50 ms, p95 ms, errors)"""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mine, failed = [], 0
+        while time.monotonic() < stop_at:
+            method, path = make_request()
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, headers={'Content-Length': '0'} if method == 'POST' else {})
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - start)
+            else:
+                failed += 1
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        return 0.0, None, None, sum(errors)
+    latencies.sort()
+    return (len(latencies) / elapsed,
+            statistics.median(latencies) * 1000,
+            latencies[int(len(latencies) * 0.95)] * 1000,
+            sum(errors))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--profiles', nargs='+', default=[os.environ.get('DB_PROFILE', 'tuned')])
+    args = parser.parse_args()
+
+    print(f'\n{os.cpu_count()} CPUs, {args.threads} threads/worker, {args.clients} clients, {args.duration:.0f}s per run')
+    print(f'{"profile":<8} {"workers":>7}  {"scenario":<14} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7}')
+    for profile in args.profiles:
+        uri, (toggles, completable) = prepare_database(profile)
+        to_complete = iter(completable)
+        scenarios = {
+            'GET /': lambda: ('GET', '/'),
+            'POST toggle': lambda: ('POST', '/api/task/{}/toggle-subtask/{}'.format(*random.choice(toggles))),
+            'POST complete': lambda: ('POST', f'/task/{next(to_complete)}/complete'),
+        }
+        for workers in args.workers:
+            port = free_port()
+            server = start_server(workers, args.threads, port, uri, profile)
+            try:
+                for name, make_request in scenarios.items():
+                    rps, p50, p95, errors = drive(port, make_request, args.clients, args.duration)
+                    p50 = f'{p50:.1f}' if p50 is not None else '-'
+                    p95 = f'{p95:.1f}' if p95 is not None else '-'
+                    print(f'{profile:<8} {workers:>7}  {name:<14} {rps:>8.0f} {p50:>8} {p95:>8} {errors:>7}')
+            finally:
+                server.terminate()
+                server.wait(10)
+    print(f'\nDatabases left in {BENCH_DIR}')
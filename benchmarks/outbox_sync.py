@@ -0,0 +1,135 @@
+"""Graph outbox delivery against a local fake Pixela endpoint.
+
+Completes a batch of tasks (no HTTP on the request path), then drains the
+outbox through a fake server that is slow and rejects the first few
+requests, with several workers draining at once as they do in a
+multi-process deployment. Checks that completions on the same day were
+coalesced into a few absolute updates, that failures were retried, that no
+update was sent by two workers, and that the final quantity is exact.
+
+    python benchmarks/outbox_sync.py [completions]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMPLETIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+FAIL_FIRST = 3
+SERVER_DELAY = 0.2
+WORKERS = 3
+
+
+class FakePixela(BaseHTTPRequestHandler):
+    """Records PUT quantities per day; fails the first FAIL_FIRST requests"""
+    protocol_version = 'HTTP/1.1'
+    lock = threading.Lock()
+    requests = 0
+    pixels = {}
+
+    def do_PUT(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(SERVER_DELAY)
+        with self.lock:
+            FakePixela.requests += 1
+            reject = FakePixela.requests <= FAIL_FIRST
+            if not reject:
+                FakePixela.pixels[self.path.rsplit('/', 1)[1]] = int(body['quantity'])
+        status, payload = (503, b'{"isSuccess":false,"isRejected":true}') if reject else (200, b'{"isSuccess":true}')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), FakePixela)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ['DB_URI'] = f'sqlite:///{DB_PATH}'
+os.environ.update({
+    'GRAPH_EXPORTER': 'pixela',
+    'PIXELA_BASE_URL': f'http://127.0.0.1:{server.server_address[1]}/v1/users',
+    'PIXELA_USERNAME': 'bench',
+    'PIXELA_TOKEN': 'secret',
+    'PIXELA_GRAPH_ID': 'conquer',
+    'OUTBOX_IN_PROCESS': '0',
+})
+
+from app import create_app, db  # noqa: E402
+from app.models import DEFAULT_USER_ID, TaskTemplate, TaskInstance, UserProgress  # noqa: E402
+from app.outbox import OutboxWorker, queue_metrics  # noqa: E402
+
+app = create_app()
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        db.create_all()
+        template = TaskTemplate(title='Sync', category='Work', task_type='daily',
+                                effort_type='mental', location_type='any')
+        db.session.add(template)
+        db.session.flush()
+        db.session.execute(TaskInstance.__table__.insert(), [
+            {'template_id': template.id, 'selected_tier': 1, 'created_at': datetime.now(),
+             'xp_earned': 0, 'completed_count': 1, 'available_count': 1}
+            for _ in range(COMPLETIONS)
+        ])
+        UserProgress.provision(DEFAULT_USER_ID)
+        db.session.commit()
+
+    client = app.test_client()
+    start = time.perf_counter()
+    for instance_id in range(1, COMPLETIONS + 1):
+        assert client.post(f'/task/{instance_id}/complete').status_code == 302
+    per_request_ms = (time.perf_counter() - start) / COMPLETIONS * 1000
+
+    with app.app_context():
+        print(f'\n{COMPLETIONS} completions at {per_request_ms:.2f} ms each '
+              f'(fake endpoint latency is {SERVER_DELAY * 1000:.0f} ms)')
+        print(f'   queued: {queue_metrics()}')
+
+    # One worker per web process, all polling the same table
+    workers = [OutboxWorker(app, base_backoff=0.05) for _ in range(WORKERS)]
+    drain_start = time.perf_counter()
+    while True:
+        threads = [threading.Thread(target=worker.drain_once) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with app.app_context():
+            queue = queue_metrics()
+        if queue['depth'] == 0:
+            break
+        time.sleep(0.05)
+    drain_seconds = time.perf_counter() - drain_start
+    for worker in workers:
+        worker.stop()
+
+    sent = sum(worker.updates_sent for worker in workers)
+    failed = sum(worker.updates_failed for worker in workers)
+    batches = sum(worker.batches for worker in workers)
+    print(f'   drained by {WORKERS} workers in {drain_seconds:.2f}s: {sent} updates sent, {failed} failed, '
+          f'{batches} batches')
+    print(f'   HTTP requests: {FakePixela.requests}, pixels: {FakePixela.pixels}')
+
+    today = datetime.now(timezone.utc).strftime('%Y%m%d')
+    assert FakePixela.pixels.get(today) == COMPLETIONS, 'Final quantity is wrong'
+    assert FakePixela.requests == sent + failed, 'Requests were sent outside a claimed batch'
+    assert sent == 1, f'{sent} workers delivered the same day'
+    assert FakePixela.requests <= FAIL_FIRST + 1 + batches, 'Completions were not coalesced'
+    assert failed == FAIL_FIRST
+    print('\n✅ Outbox delivered coalesced updates with retry')
+    server.shutdown()
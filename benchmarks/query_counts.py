@@ -0,0 +1,107 @@
+"""SQL statement counts per route at increasing row counts.
+
+Renders each route against a small and a large dataset and checks the number
+of statements stays the same, i.e. no route issues one lazy load per row.
+
+    python benchmarks/query_counts.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ['DB_URI'] = f'sqlite:///{DB_PATH}'
+
+from app import create_app, db  # noqa: E402
+from app.commands import init_db  # noqa: E402
+from app.models import TaskTemplate, SubTask, TaskInstance, SubTaskCompletion, CATEGORIES  # noqa: E402
+from app.querycount import count_queries, assert_max_queries  # noqa: E402
+from app.catalog import catalog  # noqa: E402
+from app.users import progress_cache  # noqa: E402
+from app.fragments import fragment_cache  # noqa: E402
+
+app = create_app()
+
+# Upper bounds per route; the real check is that counts do not grow with data.
+# The template list reads the in-memory catalog, so it only queries on a
+# rebuild (templates, subtasks); the filter API runs one
+# page query plus one query per facet. Task detail and the filter GET first
+# read the version stamp their ETag is made of. A dashboard that misses the
+# fragment cache reads today's open and completed tasks and the week's counts.
+ROUTES = [
+    ('dashboard', 'GET', '/', None, 4),
+    ('templates', 'GET', '/templates', None, 2),
+    ('task detail', 'GET', '/task/1', None, 3),
+    ('filter api', 'POST', '/api/templates/filter', {'effort_type': 'physical'}, 4),
+    ('filter api get', 'GET', '/api/templates/filter?effort_type=physical', None, 5),
+]
+
+
+def add_rows(templates, instances):
+    """Add `templates` templates and `instances` of today's instances with completions"""
+    now = datetime.now()
+    new_templates = []
+    for i in range(templates):
+        template = TaskTemplate(title=f'Template {i}', category=CATEGORIES[i % len(CATEGORIES)],
+                                task_type='daily', effort_type='physical', location_type='indoor')
+        db.session.add(template)
+        new_templates.append(template)
+    db.session.flush()
+    for template in new_templates:
+        for order in range(6):
+            db.session.add(SubTask(template_id=template.id, description=f'Step {order}',
+                                   level=order // 2 + 1, order=order))
+    db.session.flush()
+
+    for i in range(instances):
+        template = new_templates[i % len(new_templates)]
+        done = i % 3 == 0
+        instance = TaskInstance(template=template, selected_tier=3, created_at=now,
+                                completed_at=now if i % 2 else None,
+                                available_count=len(template.subtasks),
+                                completed_count=len(template.subtasks) if done else 0)
+        db.session.add(instance)
+        for subtask in template.subtasks:
+            db.session.add(SubTaskCompletion(task_instance=instance, subtask=subtask, completed=done))
+    db.session.commit()
+    # Measure the cold paths: catalog rebuild, progress lookup and dashboard
+    # fragment renders included
+    catalog.invalidate()
+    progress_cache.invalidate()
+    fragment_cache().backend.clear()
+
+
+def measure(client, engine):
+    """Call outside an app context so every request gets its own session"""
+    counts = {}
+    for name, method, path, payload, limit in ROUTES:
+        with assert_max_queries(limit, engine), count_queries(engine) as counter:
+            response = client.open(path, method=method, json=payload)
+        assert response.status_code == 200, (name, response.status_code)
+        counts[name] = counter.count
+    return counts
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        init_db()
+        engine = db.engine
+    client = app.test_client()
+
+    with app.app_context():
+        add_rows(templates=5, instances=5)
+    small = measure(client, engine)
+    with app.app_context():
+        add_rows(templates=200, instances=300)
+    large = measure(client, engine)
+
+    print(f'\n{"route":<14} {"small":>7} {"large":>7}')
+    for name, *_ in ROUTES:
+        print(f'{name:<14} {small[name]:>7} {large[name]:>7}')
+    assert small == large, 'Query count grows with row count (N+1)'
+    print('\n✅ Query counts are constant')
@@ -0,0 +1,267 @@
+"""Latency percentiles and query counts for every route, on synthetic data.
+
+Generates a dataset with benchmarks/datagen.py, then calls every route of
+the `main` blueprint through the Flask test client, read routes first. Each
+scenario runs `--iterations` times after a warm-up request. The script
+fails if a route has no scenario, so new routes must be added here.
+
+Results are printed as a table and written as JSON (`--out`). Pass a
+previous file with `--compare` to print per-route deltas.
+
+    python benchmarks/routes.py [--templates 500] [--years 3] [--iterations 50]
+                                [--out results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+import sqlalchemy  # noqa: E402
+from flask import current_app  # noqa: E402
+from app import db, library  # noqa: E402
+from app.models import TaskTemplate, SubTask, TaskInstance, SubTaskCompletion  # noqa: E402
+from app.querycount import count_queries  # noqa: E402
+
+OK = (200, 201, 302, 304)
+
+
+def make_instances(template_id, count, tier=1, done=False):
+    """`count` fresh instances of a template, optionally with every subtask checked"""
+    instances = [TaskInstance(template_id=template_id, selected_tier=tier) for _ in range(count)]
+    db.session.add_all(instances)
+    db.session.flush()
+    ids = [instance.id for instance in instances]
+    for instance_id in ids:
+        SubTaskCompletion.add_for_tier(instance_id, template_id, tier)
+    if done:
+        db.session.execute(db.update(SubTaskCompletion)
+                           .where(SubTaskCompletion.task_instance_id.in_(ids))
+                           .values(completed=True))
+        db.session.execute(db.update(TaskInstance)
+                           .where(TaskInstance.id.in_(ids))
+                           .values(completed_count=TaskInstance.available_count))
+    return ids
+
+
+def build_scenarios(runs):
+    """[(name, endpoint, make_request)] where make_request() -> (method, path, kwargs)"""
+    popular = db.session.scalar(
+        db.select(TaskInstance.template_id).group_by(TaskInstance.template_id)
+        .order_by(db.func.count().desc()).limit(1)
+    )
+    # A template of its own for the edit form, so repeated edits do not touch the dataset
+    editable = TaskTemplate(title='Bench edit', category='Work', task_type='daily',
+                            effort_type='mental', location_type='any')
+    editable.subtasks = [SubTask(description=f'Edit step {i}', level=1 + i % 3, order=i) for i in range(6)]
+    db.session.add(editable)
+    db.session.flush()
+
+    detail_id = make_instances(popular, 1, tier=3)[0]
+    toggle = db.session.execute(
+        db.select(SubTaskCompletion.task_instance_id, SubTaskCompletion.id)
+        .where(SubTaskCompletion.task_instance_id == detail_id).limit(1)
+    ).one()
+    editable_id = editable.id
+    upgradable = iter(make_instances(popular, runs, done=True))
+    completable = iter(make_instances(popular, runs, done=True))
+    deletable = iter(make_instances(popular, runs))
+    db.session.commit()
+
+    edit_form = {
+        'title': 'Bench edit', 'category': 'Work', 'task_type': 'daily', 'effort_type': 'mental',
+        'location_type': 'any', 'base_xp_low': '10', 'base_xp_medium': '20', 'base_xp_high': '30',
+        'subtask_description[]': [f'Edit step {i}' for i in range(6)],
+        'subtask_level[]': [str(1 + i % 3) for i in range(6)],
+    }
+    create_form = dict(edit_form, title='Bench create')
+    plan = {'quests': [{'template_id': popular, 'tier': 1 + i % 3} for i in range(5)]}
+    # Re-importing part of the library: every record matches and nothing changes
+    library_slice = ''.join(line for line, _ in zip(library.export_jsonl(), range(20)))
+
+    # Revalidations of unchanged pages, as a browser sends them
+    def revalidate(path):
+        etag = current_app.test_client().get(path).headers['ETag']
+        return {'headers': {'If-None-Match': etag}}
+    templates_304 = revalidate('/templates')
+    detail_304 = revalidate(f'/task/{detail_id}')
+    filter_304 = revalidate('/api/templates/filter?effort_type=physical')
+
+    return [
+        # Reads
+        ('dashboard', 'main.dashboard', lambda: ('GET', '/', {})),
+        ('heatmap', 'main.heatmap', lambda: ('GET', '/heatmap.svg', {})),
+        ('templates', 'main.templates_list', lambda: ('GET', '/templates', {})),
+        ('templates by category', 'main.templates_list', lambda: ('GET', '/templates?category=Cleaning', {})),
+        ('templates (304)', 'main.templates_list', lambda: ('GET', '/templates', templates_304)),
+        ('create template form', 'main.create_template', lambda: ('GET', '/template/create', {})),
+        ('edit template form', 'main.edit_template', lambda: ('GET', f'/template/{editable_id}/edit', {})),
+        ('quest select', 'main.quest_select', lambda: ('GET', '/quests', {})),
+        ('task detail', 'main.task_detail', lambda: ('GET', f'/task/{detail_id}', {})),
+        ('task detail (304)', 'main.task_detail', lambda: ('GET', f'/task/{detail_id}', detail_304)),
+        ('outbox metrics', 'main.outbox_metrics', lambda: ('GET', '/api/outbox/metrics', {})),
+        ('open event stream', 'main.events', lambda: ('GET', '/api/events', {'buffered': False})),
+        ('events metrics', 'main.events_metrics', lambda: ('GET', '/api/events/metrics', {})),
+        ('cache metrics', 'main.cache_metrics', lambda: ('GET', '/api/cache/metrics', {})),
+        ('filter api', 'main.filter_templates', lambda: ('POST', '/api/templates/filter', {'json': {}})),
+        ('filter api faceted', 'main.filter_templates',
+         lambda: ('POST', '/api/templates/filter', {'json': {'category': 'Cleaning', 'effort_type': 'physical'}})),
+        ('filter api get', 'main.filter_templates',
+         lambda: ('GET', '/api/templates/filter?effort_type=physical', {})),
+        ('filter api (304)', 'main.filter_templates',
+         lambda: ('GET', '/api/templates/filter?effort_type=physical', filter_304)),
+        ('export templates', 'main.export_templates', lambda: ('GET', '/api/templates/export', {})),
+        ('import templates', 'main.import_templates',
+         lambda: ('POST', '/api/templates/import', {'data': library_slice, 'content_type': 'application/x-ndjson'})),
+        # Writes
+        ('toggle subtask', 'main.toggle_subtask',
+         lambda: ('POST', '/task/{}/toggle-subtask/{}'.format(*toggle), {})),
+        ('toggle subtask api', 'main.toggle_subtask_api',
+         lambda: ('POST', '/api/task/{}/toggle-subtask/{}'.format(*toggle), {})),
+        ('upgrade tier', 'main.upgrade_tier', lambda: ('POST', f'/task/{next(upgradable)}/upgrade-tier', {})),
+        ('complete task', 'main.complete_task', lambda: ('POST', f'/task/{next(completable)}/complete', {})),
+        ('delete task', 'main.delete_task_instance', lambda: ('POST', f'/task/{next(deletable)}/delete', {})),
+        ('add task', 'main.add_task_from_template',
+         lambda: ('POST', f'/template/{popular}/add', {'data': {'tier': '2'}})),
+        ('plan day', 'main.plan_day', lambda: ('POST', '/api/plan', {'json': plan})),
+        ('edit template', 'main.edit_template',
+         lambda: ('POST', f'/template/{editable_id}/edit', {'data': edit_form})),
+        ('create template', 'main.create_template', lambda: ('POST', '/template/create', {'data': create_form})),
+    ]
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def run(app, scenarios, iterations):
+    """Time each scenario. Call outside an app context so every request gets its own session."""
+    with app.app_context():
+        engine = db.engine
+    client = app.test_client()
+    results = {}
+    for name, endpoint, make_request in scenarios:
+        timings, queries, statuses = [], [], set()
+        for i in range(iterations + 1):
+            method, path, kwargs = make_request()
+            with count_queries(engine) as counter:
+                start = time.perf_counter()
+                response = client.open(path, method=method, **kwargs)
+                if response.mimetype == 'text/event-stream':
+                    next(iter(response.response))  # endless; time up to the first chunk
+                else:
+                    response.get_data()  # drain streamed bodies inside the timing
+                response.close()
+                elapsed = time.perf_counter() - start
+            if response.status_code not in OK:
+                raise AssertionError(f'{name}: {method} {path} returned {response.status_code}')
+            if i == 0:
+                continue  # warm-up
+            timings.append(elapsed * 1000)
+            queries.append(counter.count)
+            statuses.add(response.status_code)
+        timings.sort()
+        results[name] = {
+            'endpoint': endpoint,
+            'method': method,
+            'n': iterations,
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'max_ms': round(timings[-1], 3),
+            'queries_min': min(queries),
+            'queries_max': max(queries),
+            'statuses': sorted(statuses),
+        }
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    header = f'{"route":<24} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8}'
+    if baseline:
+        header += f' {"Δp50":>8} {"Δp95":>8} {"Δqueries":>9}'
+    print(header)
+    for name, r in results.items():
+        q = str(r['queries_max']) if r['queries_min'] == r['queries_max'] else f'{r["queries_min"]}-{r["queries_max"]}'
+        line = f'{name:<24} {r["p50_ms"]:>8.2f} {r["p95_ms"]:>8.2f} {r["p99_ms"]:>8.2f} {q:>8}'
+        old = (baseline or {}).get(name)
+        if old:
+            line += (f' {(r["p50_ms"] / old["p50_ms"] - 1) * 100:>+7.0f}%'
+                     f' {(r["p95_ms"] / old["p95_ms"] - 1) * 100:>+7.0f}%'
+                     f' {r["queries_max"] - old["queries_max"]:>+9}')
+        elif baseline:
+            line += f' {"new":>8}'
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark every route on synthetic data')
+    parser.add_argument('--templates', type=int, default=500)
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--tasks-per-day', type=float, default=8.0)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='Write results as JSON to this file.')
+    parser.add_argument('--compare', help='Results JSON from an earlier run to diff against.')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+    app = datagen.create_database(path)
+    with app.app_context():
+        dataset = datagen.generate(templates=args.templates, years=args.years,
+                                   tasks_per_day=args.tasks_per_day, seed=args.seed)
+        scenarios = build_scenarios(args.iterations + 1)
+
+    covered = {endpoint for _, endpoint, _ in scenarios}
+    missing = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.endpoint.startswith('main.') and rule.endpoint not in covered)
+    if missing:
+        sys.exit(f'No benchmark scenario for: {", ".join(missing)}')
+
+    results = run(app, scenarios, args.iterations)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'seed': args.seed,
+            'dataset': dataset,
+        },
+        'routes': results,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['routes']
+
+    print(f'\nDataset: {", ".join(f"{k}={v:,}" for k, v in dataset.items())}\n')
+    print_table(results, baseline)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nResults written to {args.out}')
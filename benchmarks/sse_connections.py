@@ -0,0 +1,231 @@
+"""Idle /api/events streams one gunicorn worker can hold, and event fan-out.
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app` with a single worker of each
+--worker-classes entry, then opens idle event streams in steps
+(--connections). After each step it reports:
+
+- how long opening the streams took and how many the server refused (503);
+- the worker's resident memory and its growth per open stream;
+- GET / latency while the streams sit idle;
+- fan-out: the time from one subtask toggle until every stream has the event.
+
+All streams belong to one user, so each toggle is delivered to all of them.
+The client reads every socket from one thread with selectors. Linux only
+(worker memory comes from /proc).
+
+    python benchmarks/sse_connections.py [--connections 100 1000 5000]
+                                         [--worker-classes gevent gthread]
+
+With gevent, memory per stream should stay in the tens of KB and fan-out
+should grow roughly linearly with the number of streams. With gthread, streams beyond EVENTS_MAX_STREAMS (half the
+worker's threads) get a 503, so ordinary requests keep their threads.
+"""
+
+import argparse
+import http.client
+import os
+import resource
+import selectors
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+from app import db  # noqa: E402
+from app.models import TaskInstance, SubTaskCompletion  # noqa: E402
+
+REQUEST = b'GET /api/events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(worker_class, port, uri):
+    env = dict(os.environ, WEB_CONCURRENCY='1', WEB_WORKER_CLASS=worker_class, BIND=f'127.0.0.1:{port}',
+               OUTBOX_IN_PROCESS='0', DB_URI=uri, EVENTS_HEARTBEAT_SECONDS='60')
+    env.pop('EVENTS_MAX_STREAMS', None)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning', 'wsgi:app'],
+        cwd=ROOT, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def worker_rss_kb(server):
+    """Resident memory of the gunicorn worker (the master's only child)"""
+    with open(f'/proc/{server.pid}/task/{server.pid}/children') as f:
+        pid = int(f.read().split()[0])
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+class Streams:
+    """Many raw event-stream sockets, read from one thread"""
+
+    def __init__(self, port):
+        self.port = port
+        self.selector = selectors.DefaultSelector()
+        self.buffers = {}
+        self.refused = 0
+
+    def open(self, count, timeout=60):
+        """Open `count` more streams; returns once each is established or refused"""
+        pending = set()
+        for _ in range(count):
+            sock = socket.create_connection(('127.0.0.1', self.port))
+            sock.sendall(REQUEST)
+            sock.setblocking(False)
+            self.selector.register(sock, selectors.EVENT_READ)
+            self.buffers[sock] = b''
+            pending.add(sock)
+        deadline = time.monotonic() + timeout
+        while pending and time.monotonic() < deadline:
+            for sock in self._read(0.5):
+                data = self.buffers[sock]
+                if b' 503 ' in data.split(b'\r\n', 1)[0]:
+                    self._drop(sock)
+                    self.refused += 1
+                    pending.discard(sock)
+                elif b'retry:' in data:
+                    self.buffers[sock] = b''
+                    pending.discard(sock)
+        if pending:
+            raise RuntimeError(f'{len(pending)} streams did not open in {timeout}s')
+
+    def wait_for(self, marker, since, timeout=60):
+        """Seconds from `since` (a perf_counter value) until every open stream has received `marker`"""
+        waiting = set(self.buffers)
+        deadline = time.monotonic() + timeout
+        while waiting and time.monotonic() < deadline:
+            for sock in self._read(0.5):
+                if marker in self.buffers[sock]:
+                    waiting.discard(sock)
+        if waiting:
+            raise RuntimeError(f'{len(waiting)} streams missed the event')
+        elapsed = time.perf_counter() - since
+        for sock in self.buffers:
+            self.buffers[sock] = b''
+        return elapsed
+
+    def _read(self, timeout):
+        ready = []
+        for key, _ in self.selector.select(timeout):
+            sock = key.fileobj
+            try:
+                data = sock.recv(65536)
+            except BlockingIOError:
+                continue
+            if not data:
+                self._drop(sock)
+                continue
+            self.buffers[sock] += data
+            ready.append(sock)
+        return ready
+
+    def _drop(self, sock):
+        self.selector.unregister(sock)
+        self.buffers.pop(sock, None)
+        sock.close()
+
+    def close(self):
+        for sock in list(self.buffers):
+            self._drop(sock)
+
+
+def request_ms(port, method, path, repeat=20):
+    samples = []
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.request(method, path, headers={'Content-Length': '0'} if method == 'POST' else {})
+        response = conn.getresponse()
+        response.read()
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status < 400, (path, response.status)
+    conn.close()
+    return statistics.median(samples)
+
+
+def run(worker_class, uri, toggle_path, steps):
+    port = free_port()
+    server = start_server(worker_class, port, uri)
+    streams = Streams(port)
+    try:
+        baseline = worker_rss_kb(server)
+        print(f'\n{worker_class}: worker RSS {baseline / 1024:.1f} MB before any stream')
+        print(f'{"streams":>8} {"refused":>8} {"open s":>7} {"RSS MB":>7} {"KB/stream":>10} '
+              f'{"GET / ms":>9} {"fan-out ms":>11}')
+        opened = 0
+        for target in steps:
+            start = time.perf_counter()
+            streams.open(target - opened)
+            open_seconds = time.perf_counter() - start
+            opened = target
+            held = len(streams.buffers)
+            rss = worker_rss_kb(server)
+            per_stream = (rss - baseline) / held if held else 0
+            dashboard = request_ms(port, 'GET', '/')
+            fan_out = []
+            for _ in range(3):
+                started = time.perf_counter()
+                request_ms(port, 'POST', toggle_path, repeat=1)
+                fan_out.append(streams.wait_for(b'event: subtask', started) * 1000)
+            print(f'{held:>8,} {streams.refused:>8,} {open_seconds:>7.2f} {rss / 1024:>7.1f} {per_stream:>10.1f} '
+                  f'{dashboard:>9.2f} {statistics.median(fan_out):>11.1f}')
+    finally:
+        streams.close()
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--connections', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--worker-classes', nargs='+', default=['gevent'])
+    args = parser.parse_args()
+
+    # Each stream needs a descriptor here and one in the server
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    needed = max(args.connections) + 256
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+        if hard < needed:
+            sys.exit(f'Open file limit {hard} is too low for {max(args.connections)} streams')
+
+    path = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+    app = datagen.create_database(path)
+    with app.app_context():
+        datagen.generate(templates=50, years=0.25, tasks_per_day=4)
+        instance_id, completion_id = db.session.execute(
+            db.select(SubTaskCompletion.task_instance_id, SubTaskCompletion.id)
+            .join(TaskInstance).where(TaskInstance.completed_at.is_(None)).limit(1)
+        ).one()
+    toggle_path = f'/api/task/{instance_id}/toggle-subtask/{completion_id}'
+
+    for worker_class in args.worker_classes:
+        run(worker_class, app.config['SQLALCHEMY_DATABASE_URI'], toggle_path, sorted(args.connections))
+    print(f'\nDatabase left at {path}')
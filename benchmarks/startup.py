@@ -0,0 +1,77 @@
+"""Process startup cost: import, create_app() and the first request.
+
+Each sample runs in a fresh interpreter against an already-initialised
+SQLite database, the way a new web worker starts. Checks that building the
+app executes no SQL at all (schema work belongs to `flask init-db`), and
+reports medians for each phase.
+
+    python benchmarks/startup.py [samples]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SAMPLES = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ['DB_URI'] = f'sqlite:///{DB_PATH}'
+
+# Runs in the child interpreter; prints one JSON line of timings
+CHILD = r'''
+import json, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+startup_statements = list(statements)
+response = app.test_client().get('/')
+t3 = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000,
+    'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000,
+    'status': response.status_code,
+    'startup_statements': startup_statements,
+}))
+'''
+
+
+def sample():
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=os.environ,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    from app import create_app
+    from app.commands import init_db
+
+    with create_app().app_context():
+        init_db()
+
+    runs = [sample() for _ in range(SAMPLES)]
+
+    print(f'\n{"phase":<16} {"median ms":>10} {"max ms":>10}')
+    for phase in ('import_ms', 'create_app_ms', 'first_request_ms'):
+        values = [run[phase] for run in runs]
+        print(f'{phase[:-3]:<16} {statistics.median(values):>10.1f} {max(values):>10.1f}')
+
+    assert all(run['status'] == 200 for run in runs), 'First request failed'
+    statements = runs[0]['startup_statements']
+    assert not statements, f'create_app() ran SQL: {statements}'
+    print('\n✅ App startup runs no SQL; schema changes happen only in `flask init-db`')
@@ -0,0 +1,114 @@
+"""Per-user dashboard latency as the number of users grows to 10k.
+
+Generates one "probe" user with a full history (benchmarks/datagen.py),
+then adds background users with their own libraries and history in steps
+(--users, default 100, 1,000 and 10,000). After each step it times the
+dashboard for the probe user and for users picked at random from the whole
+population, identified by the X-User-Id header (USER_ID_HEADER).
+
+Every dashboard query filters on user_id first and is served by an index
+led by it, so latency should track the size of one user's data, not the
+total: the table should stay flat while task_instance grows by orders of
+magnitude.
+
+    python benchmarks/tenancy.py [--users 100 1000 10000] [--requests 300]
+                                 [--templates 20] [--years 0.1] [--tasks-per-day 3]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datagen  # noqa: E402
+from app import db  # noqa: E402
+from app.models import DEFAULT_USER_ID, TaskInstance  # noqa: E402
+
+HEADER = 'X-User-Id'
+PROBE_USER = DEFAULT_USER_ID
+
+
+def time_dashboards(client, user_ids, requests):
+    samples = []
+    for i in range(requests + 1):
+        start = time.perf_counter()
+        response = client.get('/', headers={HEADER: str(user_ids[i % len(user_ids)])})
+        response.close()
+        elapsed = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, response.status_code
+        if i:  # the first request warms up
+            samples.append(elapsed)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def dashboard_plan():
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    rows = db.session.execute(
+        db.text('EXPLAIN QUERY PLAN SELECT id FROM task_instance '
+                'WHERE user_id = :u AND created_at >= :s AND created_at < :e'),
+        {'u': PROBE_USER, 's': today, 'e': today + timedelta(days=1)}
+    ).all()
+    return '; '.join(row[-1] for row in rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Dashboard latency per user as users grow')
+    parser.add_argument('--users', type=int, nargs='+', default=[100, 1_000, 10_000])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--templates', type=int, default=20, help='Templates per background user.')
+    parser.add_argument('--years', type=float, default=0.1, help='History per background user.')
+    parser.add_argument('--tasks-per-day', type=float, default=3.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='conquer-bench-'), 'bench.db')
+    app = datagen.create_database(path, USER_ID_HEADER=HEADER)
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        datagen.generate(templates=200, years=1, tasks_per_day=8, seed=args.seed, first_user_id=PROBE_USER)
+        probe_instances = db.session.scalar(
+            db.select(db.func.count(TaskInstance.id)).where(TaskInstance.user_id == PROBE_USER))
+
+    print(f'\nProbe user {PROBE_USER}: {probe_instances:,} task instances')
+    print(f'{"users":>8} {"instances":>11} {"gen s":>7} {"probe p50":>10} {"probe p95":>10} '
+          f'{"random p50":>11} {"random p95":>11}')
+    client = app.test_client()
+    users, results = 1, []
+    for target in sorted(args.users):
+        start = time.perf_counter()
+        with app.app_context():
+            if target > users:
+                datagen.generate(templates=args.templates, subtasks=(2, 6), years=args.years,
+                                 tasks_per_day=args.tasks_per_day, today_tasks=3, seed=args.seed + target,
+                                 users=target - users, first_user_id=PROBE_USER + users)
+                users = target
+            instances = db.session.scalar(db.select(db.func.count(TaskInstance.id)))
+        generated = time.perf_counter() - start
+
+        # Requests run outside the app context so each gets its own session
+        probe = time_dashboards(client, [PROBE_USER], args.requests)
+        sample = rng.sample(range(PROBE_USER, PROBE_USER + users), min(users, args.requests))
+        spread = time_dashboards(client, sample, args.requests)
+        results.append((users, probe))
+        print(f'{users:>8,} {instances:>11,} {generated:>7.1f} {probe[0]:>10.2f} {probe[1]:>10.2f} '
+              f'{spread[0]:>11.2f} {spread[1]:>11.2f}')
+
+    with app.app_context():
+        print(f'\n   plan[dashboard]: {dashboard_plan()}')
+
+    smallest, largest = results[0][1][0], results[-1][1][0]
+    if largest <= smallest * 2:
+        print(f'\n✅ Probe p50 went from {smallest:.2f} to {largest:.2f} ms across '
+              f'{results[0][0]:,} → {results[-1][0]:,} users')
+    else:
+        print(f'\n⚠️  Probe p50 grew from {smallest:.2f} to {largest:.2f} ms')
+    print(f'\nDatabase left at {path}')
@@ -6,10 +6,100 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def engine_options(uri, profile):
+    """SQLALCHEMY_ENGINE_OPTIONS for the DB_PROFILE selected in the environment.
+
+    'tuned' (default) sizes the connection pool for server databases and
+    pre-pings/recycles its connections; SQLite gets its tuning from
+    sqlite_pragmas() instead. 'default' leaves SQLAlchemy's defaults.
+    """
+    if profile == "default" or uri.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
+def sqlite_pragmas(uri, profile):
+    """PRAGMAs run on every new SQLite connection for the selected DB_PROFILE.
+
+    WAL lets readers run while a writer commits, synchronous=NORMAL is still
+    crash-safe under WAL, and busy_timeout makes writers wait for the lock
+    instead of failing straight away.
+    """
+    if profile == "default" or not uri.startswith("sqlite"):
+        return {}
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "cache_size": -64000,  # KiB, i.e. 64 MB per connection
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+
 class Config:
     SECRET_KEY = os.environ["SECRET_KEY"]
     SQLALCHEMY_DATABASE_URI = os.environ["DB_URI"]
 
+    # Engine tuning: 'tuned' or 'default' (SQLAlchemy/SQLite defaults)
+    DB_PROFILE = os.environ.get("DB_PROFILE", "tuned")
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, DB_PROFILE)
+    SQLITE_PRAGMAS = sqlite_pragmas(SQLALCHEMY_DATABASE_URI, DB_PROFILE)
+
+    # Request header naming the user a request belongs to (see app/users.py).
+    # Only set this behind a proxy that authenticates users and overwrites
+    # the header; unset, every request belongs to the default user
+    USER_ID_HEADER = os.environ.get("USER_ID_HEADER")
+    # How long a process may serve a user's cached XP/streak before
+    # re-reading it; completions write through, so this only bounds how
+    # stale other processes can be
+    PROGRESS_CACHE_SECONDS = float(os.environ.get("PROGRESS_CACHE_SECONDS", "5"))
+
+    # Live updates (see app/events.py): open /api/events streams allowed per
+    # process, and seconds between keep-alive comments on idle streams
+    EVENTS_MAX_STREAMS = int(os.environ.get("EVENTS_MAX_STREAMS", "10000"))
+    EVENTS_HEARTBEAT_SECONDS = float(os.environ.get("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+    # Rendered dashboard fragments (see app/fragments.py): 'memory' (per-process
+    # LRU of FRAGMENT_CACHE_SIZE entries), 'redis' (shared, at FRAGMENT_CACHE_URL,
+    # entries expire after FRAGMENT_CACHE_TTL seconds) or 'none'
+    FRAGMENT_CACHE = os.environ.get("FRAGMENT_CACHE", "memory")
+    FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "4096"))
+    FRAGMENT_CACHE_URL = os.environ.get("FRAGMENT_CACHE_URL", "redis://localhost:6379/0")
+    FRAGMENT_CACHE_TTL = int(os.environ.get("FRAGMENT_CACHE_TTL", "86400"))
+
+    # Cache lifetime for fingerprinted static files (see app/assets.py); their
+    # URL changes with their contents, so browsers may keep them this long
+    ASSET_MAX_AGE = int(os.environ.get("ASSET_MAX_AGE", str(365 * 24 * 3600)))
+
+    # Optional external graph sync (see app/graph.py): 'pixela' or unset
+    GRAPH_EXPORTER = os.environ.get("GRAPH_EXPORTER")
+    PIXELA_BASE_URL = os.environ.get("PIXELA_BASE_URL", "https://pixe.la/v1/users")
+    PIXELA_USERNAME = os.environ.get("PIXELA_USERNAME")
+    PIXELA_TOKEN = os.environ.get("PIXELA_TOKEN")
+    PIXELA_GRAPH_ID = os.environ.get("PIXELA_GRAPH_ID")
+    # The graph belongs to one account, so only this user's completions sync
+    GRAPH_SYNC_USER_ID = int(os.environ.get("GRAPH_SYNC_USER_ID", "1"))
+
+    # Drain the graph outbox from a thread in each web process; set to 0 when
+    # running 'flask outbox-worker' as a separate process instead
+    OUTBOX_IN_PROCESS = os.environ.get("OUTBOX_IN_PROCESS", "1") != "0"
+    # Delivery attempts before an outbox row is left as dead
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+
+    # Request profiling (see app/profiling.py): Server-Timing headers and
+    # /debug/perf. Off by default; the sample rate is the fraction of
+    # requests that also get a sampled stack profile
+    PROFILING = os.environ.get("PROFILING", "0") == "1"
+    PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILING_SAMPLE_INTERVAL_MS", "5"))
+
 
 class Base(DeclarativeBase):
     pass
\ No newline at end of file
@@ -0,0 +1,46 @@
+"""Gunicorn settings for `gunicorn -c gunicorn.conf.py wsgi:app`.
+
+Every value can be overridden from the environment:
+
+    WEB_CONCURRENCY   worker processes (default: 2 x CPUs + 1)
+    WEB_WORKER_CLASS  gthread (default) or gevent
+    WEB_THREADS       threads per gthread worker (default: 4)
+    WEB_CONNECTIONS   concurrent connections per gevent worker (default: 10000)
+    WEB_PRELOAD       1 to import the app once in the master before forking
+    PORT / BIND       listen address (default: 0.0.0.0:5000)
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('WEB_THREADS', '4'))
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+worker_connections = int(os.environ.get('WEB_CONNECTIONS', '10000'))
+
+# Each open /api/events stream pins a gthread thread; keep half of them for
+# ordinary requests. The gevent worker holds streams as idle greenlets, so
+# thousands per process are fine there (see app/events.py).
+if worker_class == 'gthread':
+    os.environ.setdefault('EVENTS_MAX_STREAMS', str(max(1, threads // 2)))
+preload_app = os.environ.get('WEB_PRELOAD', '0') == '1'
+timeout = int(os.environ.get('WEB_TIMEOUT', '30'))
+keepalive = 5
+accesslog = os.environ.get('WEB_ACCESS_LOG')
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections.
+
+    With preload_app the engine (and any pooled connection) was created in
+    the master; sharing those sockets across processes corrupts them, so
+    drop the inherited pool without closing the parent's connections.
+    """
+    if not preload_app:
+        return
+    from app import db
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
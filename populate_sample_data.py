@@ -1,5 +1,7 @@
-from app import app
-from app.models import db, TaskTemplate, SubTask
+from app import create_app, db
+from app import library
+from app.catalog import catalog
+from app.commands import init_db
 
 def populate_sample_templates():
     """Add sample task templates with tiered subtasks"""
@@ -229,38 +231,22 @@ def populate_sample_templates():
     ]
     
     print("Creating sample templates...")
-    
-    for template_data in templates_data:
-        # Create template
-        template = TaskTemplate(
-            title=template_data['title'],
-            category=template_data['category'],
-            task_type=template_data['task_type'],
-            effort_type=template_data.get('effort_type'),
-            location_type=template_data.get('location_type'),
-            base_xp_low=template_data['base_xp_low'],
-            base_xp_medium=template_data['base_xp_medium'],
-            base_xp_high=template_data['base_xp_high']
-        )
-        
-        db.session.add(template)
-        db.session.flush()  # Get template ID
-        
-        # Add subtasks
-        for order, (description, level) in enumerate(template_data['subtasks']):
-            subtask = SubTask(
-                template_id=template.id,
-                description=description,
-                level=level,
-                order=order
-            )
-            db.session.add(subtask)
-        
-        print(f"  ✓ Created: {template.title} ({len(template_data['subtasks'])} subtasks)")
-    
+
+    # Upsert on title + category, so running this again changes nothing
+    records = [
+        library.normalize_record(dict(template_data, subtasks=[
+            {'description': description, 'level': level, 'order': order}
+            for order, (description, level) in enumerate(template_data['subtasks'])
+        ]), number)
+        for number, template_data in enumerate(templates_data, 1)
+    ]
+    stats = library.import_templates(records)
     db.session.commit()
-    
-    print(f"\n✅ Successfully created {len(templates_data)} templates!")
+    catalog.invalidate()
+
+    print(f"\n✅ {stats['templates_created']} templates created, {stats['templates_updated']} updated, "
+          f"{stats['templates_unchanged']} already up to date "
+          f"({stats['subtasks_created']} subtasks added)")
     print("\nTemplates by category:")
     categories = {}
     for t in templates_data:
@@ -272,9 +258,9 @@ def populate_sample_templates():
 
 
 if __name__ == '__main__':
-    with app.app_context():
-        # Create all tables
-        db.create_all()
+    with create_app().app_context():
+        # Create or upgrade the schema
+        init_db()
         
         # Populate templates
         populate_sample_templates()
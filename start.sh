@@ -8,5 +8,10 @@ echo "Opening in your browser at: http://localhost:5000"
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-# Start the Flask app
-python main.py
\ No newline at end of file
+# CONQUER_ENV=production serves with gunicorn (see gunicorn.conf.py);
+# otherwise start the Flask development server
+if [ "$CONQUER_ENV" = "production" ]; then
+    flask --app app init-db && exec gunicorn -c gunicorn.conf.py wsgi:app
+else
+    python main.py
+fi
@@ -0,0 +1,11 @@
+"""Production WSGI entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Run `flask --app app init-db` once before starting workers; building the
+app never touches the schema.
+"""
+
+from app import create_app
+
+app = create_app()